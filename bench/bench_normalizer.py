@@ -0,0 +1,94 @@
+"""
+文本规整基准
+在构造的大段 LLM 风格输出（混合代码块、链接、文件路径和 Emoji）上测量 TextNormalizer 的速度，
+与逐项多次 re.sub 的写法对比，并报告规整后送往服务器的字符数减少了多少
+
+需要在已安装 AstrBot 的环境中运行:
+    python bench/bench_normalizer.py --kb 64 --rounds 50
+"""
+
+import re
+import time
+import argparse
+import importlib.util
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PARAGRAPHS = [
+    "好的，我来帮你看看这个问题😀 首先需要确认一下依赖是否安装正确，可以参考官方文档 https://docs.python.org/3/library/re.html 里的说明。",
+    "你可以先运行下面的命令：\n\n```bash\npip install -r requirements.txt\npython -m pytest -q\n```\n\n如果还有报错，把日志发给我👍",
+    "配置文件一般放在 /etc/genie/config.yaml 或者 C:\\Users\\me\\genie\\config.yaml，修改后记得重启服务。",
+    "这里有一个示例：\n\n```python\ndef hello(name):\n    return f\"hello {name}\"\n```\n\n调用 `hello(\"world\")` 就会返回问候语✨✨",
+    "更多信息见[项目主页](https://github.com/example/project)，有问题也可以直接问我哦[CQ:face,id=14]",
+    "总的来说，这个方案在大多数情况下都能正常工作，只是在高并发时需要注意连接池的大小。",
+]
+
+
+def naive_normalize(text: str):
+    """逐项多次扫描的对照实现"""
+    references = re.findall(r"```[^\n`]*\n?([\s\S]*?)```", text)
+    text = re.sub(r"```[^\n`]*\n?[\s\S]*?```", "", text)
+    text = re.sub(r"`([^`\n]+)`", r"\1", text)
+    references += re.findall(r"\[[^\]\n]+\]\(([^)\s]+)\)", text)
+    text = re.sub(r"\[([^\]\n]+)\]\([^)\s]+\)", r"\1", text)
+    references += re.findall(r"(?:https?://|www\.)[^\s<>\"'，。！？；）】」]+", text)
+    text = re.sub(r"(?:https?://|www\.)[^\s<>\"'，。！？；）】」]+", "", text)
+    text = re.sub(r"(?<![\w/.:])(?:[A-Za-z]:\\|~/|/)(?:[\w.-]+[\\/])+[\w.-]+", "", text)
+    text = re.sub(r"\[CQ:face,[^\]]*\]", "", text)
+    text = re.sub(r"[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D\u20E3]+", "", text)
+    text = re.sub(r"[ \t]*\n\s*", "\n", text)
+    text = re.sub(r"[ \t]{2,}", " ", text)
+    return text.strip(), references
+
+
+def load_normalizer():
+    spec = importlib.util.spec_from_file_location("genie_tts_main", ROOT / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.TextNormalizer()
+
+
+def make_text(kb: int) -> str:
+    parts = []
+    size = 0
+    i = 0
+    while size < kb * 1024:
+        paragraph = PARAGRAPHS[i % len(PARAGRAPHS)]
+        parts.append(paragraph)
+        size += len(paragraph.encode("utf-8"))
+        i += 1
+    return "\n\n".join(parts)
+
+
+def measure(fn, text: str, rounds: int) -> float:
+    fn(text)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(text)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="文本规整基准")
+    parser.add_argument("--kb", type=int, default=64, help="测试文本大小（KB）")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    normalizer = load_normalizer()
+    text = make_text(args.kb)
+    cleaned, references = normalizer.normalize(text)
+    mb = len(text.encode("utf-8")) / 1024 / 1024
+
+    single = measure(normalizer.normalize, text, args.rounds)
+    naive = measure(naive_normalize, text, args.rounds)
+
+    print(f"输入: {len(text)} 字符 ({mb * 1024:.0f}KB)")
+    print(f"规整后: {len(cleaned)} 字符，减少 {1 - len(cleaned) / len(text):.1%}，提取参考信息 {len(references)} 条")
+    print(f"单次扫描: {single * 1000:.2f}ms/次, {mb / single:.1f}MB/s")
+    print(f"多次扫描: {naive * 1000:.2f}ms/次, {mb / naive:.1f}MB/s")
+    print(f"加速: {naive / single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
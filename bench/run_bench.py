@@ -0,0 +1,322 @@
+"""
+GenieTTSPlugin 压测
+启动本地桩服务器，用模拟的 AstrBot 事件按不同并发度驱动 on_decorating_result，
+统计吞吐、延迟分位数、事件循环阻塞时间和内存峰值，并可保存基线、与基线对比发现回归
+
+需要在已安装 AstrBot 的环境中运行（插件本身依赖 astrbot.api）:
+    python bench/run_bench.py --concurrency 1,8,32 --requests 200
+    python bench/run_bench.py --save-baseline default
+    python bench/run_bench.py --compare default --tolerance 0.15
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tracemalloc
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import astrbot.api.message_components as Comp
+
+from stub_server import StubServer, add_stub_arguments, stub_config_from_args
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+
+class BenchResult:
+    """模拟 LLM 回复的消息结果"""
+
+    def __init__(self, text: str):
+        self.chain = [Comp.Plain(text)]
+
+    def is_llm_result(self) -> bool:
+        return True
+
+
+class BenchEvent:
+    """模拟 AstrMessageEvent，只实现插件用到的接口"""
+
+    def __init__(self, text: str, session: str):
+        self._result = BenchResult(text)
+        self._session = session
+        self._extras = {}
+
+    def get_group_id(self) -> str:
+        return self._session
+
+    def get_sender_id(self) -> str:
+        return f"bench_{self._session}"
+
+    def get_result(self) -> BenchResult:
+        return self._result
+
+    def get_platform_name(self) -> str:
+        return "aiocqhttp"
+
+    @property
+    def unified_msg_origin(self) -> str:
+        return f"aiocqhttp:GroupMessage:{self._session}"
+
+    def is_admin(self) -> bool:
+        return False
+
+    def set_extra(self, key, value):
+        self._extras[key] = value
+
+    def get_extra(self, key=None):
+        return self._extras.get(key) if key else self._extras
+
+    async def send(self, chain):
+        pass
+
+    def voiced(self) -> bool:
+        return any(isinstance(c, Comp.Record) for c in self._result.chain)
+
+
+class LoopMonitor:
+    """定时醒来，用实际与预期的间隔差估算事件循环被阻塞的时间（低于 threshold 的计时误差不计入）"""
+
+    def __init__(self, interval: float = 0.005, threshold: float = 0.001):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+            if lag > self.threshold:
+                self.blocked += lag
+                self.max_lag = max(self.max_lag, lag)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def load_plugin_class():
+    spec = importlib.util.spec_from_file_location("genie_tts_main", ROOT / "main.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.GenieTTSPlugin
+
+
+def make_texts(count: int, chars: int, repeat_ratio: float) -> List[str]:
+    """生成测试文本；repeat_ratio 比例的请求复用前面的文本，用于观察缓存和请求合并的效果"""
+    base = "今天的天气真不错，我们一起去公园散步吧，顺便买点好吃的回来。"
+    unique = max(1, int(count * (1 - repeat_ratio)))
+    texts = []
+    for i in range(count):
+        n = i % unique
+        body = (f"第{n}条。" + base * (chars // len(base) + 1))[:chars]
+        texts.append(body)
+    return texts
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+async def run_level(plugin, stub: StubServer, concurrency: int, texts: List[str], sessions: int,
+                    trace_memory: bool) -> Dict[str, float]:
+    latencies: List[float] = []
+    voiced = 0
+    next_index = 0
+    tts_calls = stub.stats.calls["tts"]
+    worker_blocked = plugin.audio_workers.loop_blocked
+
+    async def worker():
+        nonlocal next_index, voiced
+        while next_index < len(texts):
+            i = next_index
+            next_index += 1
+            event = BenchEvent(texts[i], f"s{i % sessions}")
+            start = time.perf_counter()
+            await plugin.on_decorating_result(event)
+            latencies.append(time.perf_counter() - start)
+            voiced += event.voiced()
+
+    if trace_memory:
+        tracemalloc.start()
+    monitor = LoopMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    await monitor.stop()
+    heap_peak = 0.0
+    if trace_memory:
+        heap_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(texts),
+        "voiced": voiced,
+        "throughput": len(texts) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "loop_blocked_ms": monitor.blocked * 1000,
+        "loop_max_lag_ms": monitor.max_lag * 1000,
+        "audio_inline_ms": (plugin.audio_workers.loop_blocked - worker_blocked) * 1000,
+        "tts_calls": stub.stats.calls["tts"] - tts_calls,
+        "peak_rss_mb": peak_rss_mb(),
+        "heap_peak_mb": heap_peak,
+    }
+
+
+def parse_overrides(items: List[str]) -> Dict[str, object]:
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key] = json.loads(value)
+        except json.JSONDecodeError:
+            overrides[key] = value
+    return overrides
+
+
+def print_report(results: List[Dict[str, float]]):
+    header = f"{'并发':>4} {'请求':>5} {'语音':>5} {'吞吐/s':>8} {'P50ms':>8} {'P95ms':>8} {'P99ms':>8} " \
+             f"{'阻塞ms':>8} {'最大卡顿ms':>10} {'RSS MB':>7} {'堆峰值MB':>8}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['concurrency']:>4} {r['requests']:>5} {r['voiced']:>5} {r['throughput']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+            f"{r['loop_blocked_ms']:>8.1f} {r['loop_max_lag_ms']:>10.1f} {r['peak_rss_mb']:>7.1f} {r['heap_peak_mb']:>8.1f}"
+        )
+
+
+def compare(results: List[Dict[str, float]], baseline: Dict, tolerance: float) -> List[str]:
+    """与基线对比，返回回归描述（吞吐下降、P95 上升或事件循环阻塞增加超过容忍比例）"""
+    regressions = []
+    previous = {r["concurrency"]: r for r in baseline["levels"]}
+    for r in results:
+        base = previous.get(r["concurrency"])
+        if not base:
+            continue
+        c = r["concurrency"]
+        if r["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"并发 {c}: 吞吐 {base['throughput']:.1f} -> {r['throughput']:.1f}/s")
+        if r["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"并发 {c}: P95 {base['p95_ms']:.1f} -> {r['p95_ms']:.1f}ms")
+        # 阻塞时间本身很小时抖动较大，另加 5ms 的绝对容忍
+        if r["loop_blocked_ms"] > base["loop_blocked_ms"] * (1 + tolerance) + 5:
+            regressions.append(f"并发 {c}: 事件循环阻塞 {base['loop_blocked_ms']:.1f} -> {r['loop_blocked_ms']:.1f}ms")
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    stub = StubServer(stub_config_from_args(args))
+    port = await stub.start()
+
+    config = {
+        "server_host": "127.0.0.1",
+        "server_port": port,
+        "prob": 1.0,
+        "cooldown": 0,
+        "text_limit": 0,
+        "cache_enable": args.cache,
+        "send_text_with_audio": False,
+    }
+    config.update(parse_overrides(args.set))
+
+    plugin = load_plugin_class()(None, config)
+    try:
+        for _ in range(100):
+            if plugin.initialized:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            print("插件初始化超时", file=sys.stderr)
+            return 2
+
+        if args.warmup:
+            await run_level(plugin, stub, 1, make_texts(args.warmup, args.text_chars, 0.0), 1, False)
+
+        results = []
+        for level in (int(c) for c in args.concurrency.split(",")):
+            texts = make_texts(args.requests, args.text_chars, args.repeat_ratio)
+            results.append(await run_level(plugin, stub, level, texts, args.sessions, args.tracemalloc))
+    finally:
+        await plugin.terminate()
+        await stub.stop()
+
+    print_report(results)
+    report = {
+        "meta": {
+            "stub": vars(stub_config_from_args(args)),
+            "requests": args.requests,
+            "text_chars": args.text_chars,
+            "repeat_ratio": args.repeat_ratio,
+            "sessions": args.sessions,
+            "config": config,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "levels": results,
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n基线已保存: {path}")
+
+    if args.compare:
+        path = BASELINE_DIR / f"{args.compare}.json"
+        baseline = json.loads(path.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ 相对基线 {args.compare} 出现回归:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n✅ 未发现相对基线 {args.compare} 的回归（容忍 {args.tolerance:.0%}）")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genie TTS 插件压测")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发度")
+    parser.add_argument("--requests", type=int, default=100, help="每个并发度的请求数")
+    parser.add_argument("--warmup", type=int, default=5, help="正式测量前的预热请求数")
+    parser.add_argument("--text-chars", type=int, default=40, help="每条回复的字符数")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="重复文本的比例")
+    parser.add_argument("--sessions", type=int, default=16, help="模拟的会话数")
+    parser.add_argument("--cache", action="store_true", help="启用音频缓存")
+    parser.add_argument("--tracemalloc", action="store_true", help="用 tracemalloc 统计 Python 堆峰值（会降低吞吐）")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖插件配置，值按 JSON 解析")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--save-baseline", metavar="NAME", help="保存为 bench/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="与 bench/baselines/NAME.json 对比")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="对比时允许的相对退化")
+    add_stub_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
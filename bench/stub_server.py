@@ -0,0 +1,150 @@
+"""
+本地 Genie TTS 桩服务器
+实现 /load_character、/set_reference_audio、/tts、/unload_character，
+返回的 PCM 长度、响应延迟分布和失败率均可配置，用于在没有真实服务器时压测插件
+
+单独运行: python bench/stub_server.py --port 9999 --latency-ms 300 --failure-rate 0.05
+"""
+
+import math
+import random
+import asyncio
+import argparse
+import struct
+from dataclasses import dataclass, field
+from typing import Dict
+
+from aiohttp import web
+
+SAMPLE_RATE = 32000
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 200.0              # 平均延迟
+    jitter_ms: float = 50.0                # 延迟抖动
+    distribution: str = "uniform"          # fixed / uniform / lognormal
+    failure_rate: float = 0.0              # /tts 返回 500 的概率
+    pcm_ms_per_char: float = 120.0         # 每个字符对应的语音时长
+    silence_ms: float = 200.0              # 首尾静音时长（供去静音处理）
+    seed: int = 0
+
+
+@dataclass
+class StubStats:
+    calls: Dict[str, int] = field(default_factory=lambda: {
+        "tts": 0, "load_character": 0, "set_reference_audio": 0, "unload_character": 0
+    })
+    failures: int = 0
+    pcm_bytes: int = 0
+
+
+class StubServer:
+    """模拟 Genie TTS 服务器的 aiohttp 应用"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.stats = StubStats()
+        self._random = random.Random(config.seed)
+        self._runner = None
+        # 预先生成一秒的正弦波，按需截取，避免桩服务器自己的开销影响测量
+        self._tone = b"".join(
+            struct.pack("<h", int(8000 * math.sin(2 * math.pi * 440 * i / SAMPLE_RATE)))
+            for i in range(SAMPLE_RATE)
+        )
+
+    def _latency(self) -> float:
+        cfg = self.config
+        if cfg.distribution == "fixed":
+            ms = cfg.latency_ms
+        elif cfg.distribution == "lognormal":
+            # 以 latency_ms 为中位数、jitter_ms 控制长尾
+            sigma = math.log1p(cfg.jitter_ms / max(cfg.latency_ms, 1e-6))
+            ms = cfg.latency_ms * math.exp(self._random.gauss(0, sigma))
+        else:
+            ms = cfg.latency_ms + self._random.uniform(-cfg.jitter_ms, cfg.jitter_ms)
+        return max(0.0, ms) / 1000
+
+    def _pcm(self, text: str) -> bytes:
+        samples = int(SAMPLE_RATE * self.config.pcm_ms_per_char * max(1, len(text)) / 1000)
+        repeats, rest = divmod(samples * 2, len(self._tone))
+        silence = b"\x00\x00" * int(SAMPLE_RATE * self.config.silence_ms / 1000)
+        return silence + self._tone * repeats + self._tone[:rest] + silence
+
+    async def _tts(self, request: web.Request) -> web.Response:
+        self.stats.calls["tts"] += 1
+        payload = await request.json()
+        await asyncio.sleep(self._latency())
+        if self._random.random() < self.config.failure_rate:
+            self.stats.failures += 1
+            return web.Response(status=500, text="stub failure")
+        pcm = self._pcm(payload.get("text", ""))
+        self.stats.pcm_bytes += len(pcm)
+        return web.Response(body=pcm, content_type="application/octet-stream")
+
+    def _ok(self, name: str):
+        async def handler(request: web.Request) -> web.Response:
+            self.stats.calls[name] += 1
+            await request.read()
+            return web.json_response({"message": "ok"})
+        return handler
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/tts", self._tts)
+        for name in ("load_character", "set_reference_audio", "unload_character"):
+            app.router.add_post(f"/{name}", self._ok(name))
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """启动服务器并返回实际监听的端口"""
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="/tts 平均延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=50.0, help="延迟抖动（毫秒）")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "lognormal"], default="uniform")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="/tts 失败概率")
+    parser.add_argument("--pcm-ms-per-char", type=float, default=120.0, help="每个字符生成的语音时长（毫秒）")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        distribution=args.distribution,
+        failure_rate=args.failure_rate,
+        pcm_ms_per_char=args.pcm_ms_per_char,
+        seed=args.seed,
+    )
+
+
+async def _serve(args: argparse.Namespace):
+    server = StubServer(stub_config_from_args(args))
+    port = await server.start(args.host, args.port)
+    print(f"Genie TTS 桩服务器已启动: http://{args.host}:{port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地 Genie TTS 桩服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9999)
+    add_stub_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -1,33 +1,1637 @@
+import io
 import re
 import os
+import json
 import wave
 import html
 import uuid
+import heapq
+import hashlib
+import unicodedata
 import asyncio
-import requests
+import aiohttp
 import time
 import random
-from typing import List, Tuple, Dict, Optional
-from dataclasses import dataclass
-from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
+import shutil
+import functools
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict, Optional, Callable, Set
+from dataclasses import dataclass, field
+from collections import OrderedDict, deque
+from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult, MessageChain
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 import astrbot.api.message_components as Comp
 from astrbot.core.message.message_event_result import ResultContentType
 
 try:
-    from pydub import AudioSegment
-    from pydub.silence import detect_leading_silence
-    PYDUB_AVAILABLE = True
+    from astrbot.core.utils.astrbot_path import get_astrbot_data_path
 except ImportError:
-    PYDUB_AVAILABLE = False
-    logger.warning("[GenieTTS] pydub not installed, audio trimming disabled. Install with: pip install pydub")
+    # 旧版本 AstrBot 没有该工具函数，数据目录固定为工作目录下的 data
+    def get_astrbot_data_path() -> str:
+        return os.path.join(os.getcwd(), "data")
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logger.warning("[GenieTTS] numpy not installed, audio trimming disabled. Install with: pip install numpy")
+
+# TTS 服务器返回的 PCM 格式
+CHANNELS = 1
+SAMPLE_WIDTH = 2
+SAMPLE_RATE = 32000
+
+# 去静音参数：低于 -40dB 视为静音，按 10ms 分帧检测，结尾保留 100ms
+SILENCE_THRESH_DB = -40.0
+SILENCE_CHUNK_MS = 10
+SILENCE_KEEP_MS = 100
+
+try:
+    import pilk
+    PILK_AVAILABLE = True
+except ImportError:
+    PILK_AVAILABLE = False
+
+# 可选的输出编码格式 -> 文件扩展名
+OUTPUT_FORMATS = {"wav": "wav", "mp3": "mp3", "opus": "ogg", "silk": "silk"}
+
+# 不支持在一次回复中主动发送多条消息的平台，流式模式在这些平台上回退为单条语音
+STREAM_UNSUPPORTED_PLATFORMS = {"qq_official_webhook", "weixin_official_account", "wecom"}
+
+# 句子结束标点（含后随的引号/括号）与分句标点
+_SENTENCE_RE = re.compile(r'.+?(?:[。！？!?…～~]+[」』”’"\')）]*|\.(?=\s)|\n+|$)', re.S)
+_CLAUSE_RE = re.compile(r'.+?(?:[，、,;；：:]+|$)', re.S)
+_WORD_RE = re.compile(r'\w')
+
+
+def trim_silence_pcm(pcm: bytes, silence_thresh: float = SILENCE_THRESH_DB, keep_ms: int = SILENCE_KEEP_MS) -> bytes:
+    """
+    去除 PCM 开头和结尾的静音（向量化实现，不解码、不落盘）
+    分帧方式与 pydub.detect_leading_silence 一致：开头按正向分帧，结尾按反向分帧
+    返回: 裁剪后的 PCM
+    """
+    if not NUMPY_AVAILABLE:
+        return pcm
+
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // SAMPLE_WIDTH)
+    win = SAMPLE_RATE * SILENCE_CHUNK_MS // 1000
+    n = len(samples) // win
+    if n == 0:
+        return pcm
+    # 与 pydub 的 dBFS 相同：相对 16bit 满幅的 RMS
+    threshold = 32768.0 * 10 ** (silence_thresh / 20)
+
+    def loud_frames(frames):
+        frames = frames.reshape(n, win).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return np.flatnonzero(rms >= threshold)
+
+    head = loud_frames(samples[:n * win])
+    if head.size == 0:
+        # 整段都是静音时保持原样，交给上层判断
+        return pcm
+    tail = loud_frames(samples[len(samples) - n * win:])
+
+    start = int(head[0]) * win
+    end = len(samples) - (n - 1 - int(tail[-1])) * win
+    end = min(len(samples), end + SAMPLE_RATE * keep_ms // 1000)
+    return pcm[start * SAMPLE_WIDTH:end * SAMPLE_WIDTH]
+
+
+def normalize_pcm(pcm: bytes, target_lufs: float, peak_db: float) -> bytes:
+    """
+    响度归一化：按 400ms 块计算门限响度（BS.1770 的绝对 -70 / 相对 -10 门限，未做 K 加权），
+    增益到目标响度，同时保证峰值不超过 peak_db
+    返回: 归一化后的 PCM
+    """
+    if not NUMPY_AVAILABLE:
+        return pcm
+
+    samples = np.frombuffer(pcm, dtype="<i2", count=len(pcm) // SAMPLE_WIDTH).astype(np.float32) / 32768.0
+    block = SAMPLE_RATE * 400 // 1000
+    n = len(samples) // block
+    if n == 0:
+        return pcm
+
+    power = np.mean(samples[:n * block].reshape(n, block) ** 2, axis=1)
+    loudness = -0.691 + 10 * np.log10(np.maximum(power, 1e-12))
+    gated = power[loudness > -70.0]
+    if gated.size == 0:
+        return pcm
+    relative_gate = -0.691 + 10 * np.log10(np.mean(gated)) - 10.0
+    gated = power[loudness > max(-70.0, relative_gate)]
+    integrated = -0.691 + 10 * np.log10(np.mean(gated))
+
+    gain_db = target_lufs - integrated
+    peak = float(np.max(np.abs(samples)))
+    if peak > 0:
+        gain_db = min(gain_db, peak_db - 20 * np.log10(peak))
+    gain = 10 ** (gain_db / 20)
+    return np.clip(samples * (gain * 32768.0), -32768, 32767).astype("<i2").tobytes()
+
+
+def pcm_to_wav(pcm: bytes) -> bytes:
+    """把 PCM 封装为 WAV 文件内容"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def encoder_available(fmt: str) -> bool:
+    """检查输出格式对应的编码器是否可用（mp3/opus 依赖 ffmpeg，silk 依赖 pilk）"""
+    if fmt == "wav":
+        return True
+    if fmt == "silk":
+        return PILK_AVAILABLE
+    if fmt in OUTPUT_FORMATS:
+        return shutil.which("ffmpeg") is not None
+    return False
+
+
+def encode_audio(wav_data: bytes, fmt: str, bitrate_kbps: int = 32) -> bytes:
+    """
+    把 WAV 编码为压缩格式
+    返回: 编码后的文件内容
+    """
+    if fmt == "wav":
+        return wav_data
+
+    if fmt == "silk":
+        with wave.open(io.BytesIO(wav_data), 'rb') as wf:
+            pcm = wf.readframes(wf.getnframes())
+        with tempfile.TemporaryDirectory() as tmp:
+            pcm_path = os.path.join(tmp, "in.pcm")
+            silk_path = os.path.join(tmp, "out.silk")
+            with open(pcm_path, "wb") as f:
+                f.write(pcm)
+            pilk.encode(pcm_path, silk_path, pcm_rate=SAMPLE_RATE, tencent=True)
+            with open(silk_path, "rb") as f:
+                return f.read()
+
+    codec = ["-c:a", "libmp3lame", "-f", "mp3"] if fmt == "mp3" else ["-c:a", "libopus", "-f", "ogg"]
+    proc = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         *codec, "-b:a", f"{bitrate_kbps}k", "pipe:1"],
+        input=wav_data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    if proc.returncode != 0 or not proc.stdout:
+        raise Exception(f"ffmpeg 编码 {fmt} 失败: {proc.stderr.decode('utf-8', errors='replace').strip()}")
+    return proc.stdout
+
+
+def _in_word(text: str, i: int) -> bool:
+    """text[i - 1] 与 text[i] 是否属于同一个西文单词"""
+    return text[i - 1].isascii() and text[i].isascii() and not text[i - 1].isspace() and not text[i].isspace()
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """
+    在句子/分句边界切分文本（支持中日文和西文标点）
+    每段尽量合并到接近 max_chars，超长的句子再按分句或硬切分
+    """
+    pieces: List[str] = []
+    for sentence in _SENTENCE_RE.findall(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in _CLAUSE_RE.findall(sentence):
+            clause = clause.strip()
+            while len(clause) > max_chars:
+                cut = max_chars
+                # 切点落在西文单词中间时退到前一个空白处，没有空白才硬切
+                if _in_word(clause, cut):
+                    space = max(clause.rfind(" ", 0, cut + 1), clause.rfind("\t", 0, cut + 1))
+                    if space > 0:
+                        cut = space
+                pieces.append(clause[:cut].rstrip())
+                clause = clause[cut:].lstrip()
+            if clause:
+                pieces.append(clause)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        # 西文片段之间保留空格
+        sep = " " if chunks and chunks[-1][-1].isascii() and piece[0].isascii() else ""
+        if chunks and len(chunks[-1]) + len(sep) + len(piece) <= max_chars:
+            chunks[-1] += sep + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def split_sentences(text: str) -> List[str]:
+    """按句切分并规整（NFKC、压缩空白），没有文字的片段（纯标点、空白）丢弃"""
+    sentences = []
+    for sentence in _SENTENCE_RE.findall(text):
+        sentence = " ".join(unicodedata.normalize("NFKC", sentence).split())
+        if sentence and _WORD_RE.search(sentence):
+            sentences.append(sentence)
+    return sentences
+
+
+class TextNormalizer:
+    """
+    朗读前的文本规整
+    代码块、URL/文件路径、Emoji 和 QQ 表情按配置用一个预编译的正则在一次扫描中处理，
+    移除的代码和链接收集为参考信息；连续空白同时压缩。行内代码只去掉反引号，内容照常朗读
+    """
+
+    _EMOJI = "\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D\u20E3"
+
+    def __init__(self, filter_code: bool = True, filter_emoji: bool = True, filter_url: bool = True):
+        parts = []
+        starts = " \t\n"  # 各分支可能的首字符
+        if filter_code:
+            parts.append(r"(?P<fence>```[^\n`]*\n?(?P<fence_body>[\s\S]*?)(?:```|\Z))\s*")
+            parts.append(r"(?P<inline>`(?P<inline_body>[^`\n]+)`)")
+            starts += "`"
+        if filter_url:
+            parts.append(r"(?P<link>\[(?P<link_text>[^\]\n]+)\]\((?P<link_url>[^)\s]+)\))")
+            # 链接末尾的句读不属于链接
+            parts.append(r"(?P<url>(?:https?://|www\.)[^\s<>\"'，。！？；）】」]*[^\s<>\"'，。！？；）】」.,;:!?)\]}])[ \t]*")
+            # 后顾断言放在首字符之后，避免在每个位置上都执行
+            parts.append(
+                r"(?P<path>(?:/(?<![\w/.:]/)|~(?<![\w/.:]~)/|[A-Za-z]:\\(?<![\w/.:][A-Za-z]:\\))"
+                r"(?:[\w.-]+[\\/])+[\w.-]+)[ \t]*"
+            )
+            starts += r"\[hw/~A-Za-z"
+        if filter_emoji:
+            parts.append(rf"(?P<emoji>(?:\[CQ:face,[^\]]*\]|[{self._EMOJI}])+)[ \t]*")
+            starts += r"\[" + self._EMOJI
+        parts.append(r"(?P<newline>[ \t]*\n\s*)|(?P<spaces>[ \t]{2,})")
+        # 先用首字符集合过滤，大部分位置只需一次字符集判断，不必逐个尝试各分支
+        self._pattern = re.compile(f"(?=[{starts}])(?:{'|'.join(parts)})")
+
+    def normalize(self, text: str) -> Tuple[str, List[str]]:
+        """返回: (规整后的文本, 参考信息列表)"""
+        references: List[str] = []
+
+        def replace(match: "re.Match") -> str:
+            kind = match.lastgroup
+            if kind == "newline":
+                return "\n"
+            if kind == "spaces":
+                return " "
+            if kind == "inline":
+                return match.group("inline_body")
+            if kind == "fence":
+                body = match.group("fence_body").strip()
+                if body:
+                    references.append(body)
+                return ""
+            if kind == "link":
+                references.append(match.group("link_url"))
+                return match.group("link_text")
+            if kind == "url":
+                references.append(match.group("url"))
+                return ""
+            if kind == "path":
+                references.append(match.group("path"))
+                return ""
+            return ""
+
+        cleaned = self._pattern.sub(replace, text).strip()
+        return cleaned, list(dict.fromkeys(references))
+
 
-@dataclass
 class SessionState:
-    """会话状态"""
-    last_tts_time: float = 0.0  # 最后一次 TTS 时间
-    last_tts_text: str = ""      # 最后一次 TTS 的文本
+    """会话的临时状态（冷却计时等），空闲过久会被淘汰"""
+    __slots__ = ("last_tts_time", "last_tts_text", "last_seen")
+
+    def __init__(self):
+        self.last_tts_time: float = 0.0  # 最后一次 TTS 时间
+        self.last_tts_text: str = ""      # 最后一次 TTS 的文本
+        self.last_seen: float = 0.0       # 最后一次访问时间（monotonic）
+
+
+class SessionStore:
+    """
+    会话存储
+    开关名单用集合保存，查找为 O(1)；会话临时状态按 LRU 排列，空闲超过 ttl 或数量超过上限时淘汰；
+    开关名单和会话角色会标记为脏，由调用方定期批量快照到磁盘
+    """
+
+    def __init__(self, path: str, ttl: float, max_states: int, max_texts: int = 1000):
+        self.path = path
+        self.ttl = ttl
+        self.max_states = max(1, max_states)
+        self.enabled: Set[str] = set()
+        self.disabled: Set[str] = set()
+        self.characters: Dict[str, str] = {}  # 会话 -> 选择的角色（只记录非默认角色）
+        self.texts: Dict[str, int] = {}  # 合成过的文本 -> 次数，用作预渲染语料
+        self.max_texts = max(1, max_texts)
+        self._states: "OrderedDict[str, SessionState]" = OrderedDict()
+        self.dirty = False
+        self.evicted = 0
+
+    def get(self, sid: str) -> Optional[SessionState]:
+        state = self._states.get(sid)
+        if state is not None:
+            state.last_seen = time.monotonic()
+            self._states.move_to_end(sid)
+        return state
+
+    def get_or_create(self, sid: str) -> SessionState:
+        state = self.get(sid)
+        if state is None:
+            state = self._states[sid] = SessionState()
+            state.last_seen = time.monotonic()
+            if len(self._states) > self.max_states:
+                self._states.popitem(last=False)
+                self.evicted += 1
+        return state
+
+    def evict_idle(self) -> int:
+        """淘汰空闲超过 ttl 的会话状态；LRU 顺序即访问顺序，只需从队首检查"""
+        deadline = time.monotonic() - self.ttl
+        count = 0
+        while self._states:
+            sid, state = next(iter(self._states.items()))
+            if state.last_seen > deadline:
+                break
+            del self._states[sid]
+            count += 1
+        self.evicted += count
+        return count
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def set_enabled(self, sid: str, enabled: bool, global_enable: bool):
+        """黑名单模式下维护禁用名单，白名单模式下维护启用名单"""
+        names = self.disabled if global_enable else self.enabled
+        before = len(names)
+        if enabled != global_enable:
+            names.add(sid)
+        else:
+            names.discard(sid)
+        if len(names) != before:
+            self.dirty = True
+
+    def is_enabled(self, sid: str, global_enable: bool) -> bool:
+        if global_enable:
+            return sid not in self.disabled
+        return sid in self.enabled
+
+    def character(self, sid: str) -> str:
+        return self.characters.get(sid, "")
+
+    def set_character(self, sid: str, name: str):
+        if name:
+            self.characters[sid] = name
+        else:
+            self.characters.pop(sid, None)
+        self.dirty = True
+
+    def record_text(self, text: str):
+        self.texts[text] = self.texts.get(text, 0) + 1
+        if len(self.texts) > self.max_texts * 2:
+            # 超出一倍后一次性只保留最常见的部分，避免每次都排序
+            self.texts = dict(heapq.nlargest(self.max_texts, self.texts.items(), key=lambda item: item[1]))
+        self.dirty = True
+
+    def frequent_texts(self, count: int) -> List[str]:
+        return [text for text, _ in heapq.nlargest(count, self.texts.items(), key=lambda item: item[1])]
+
+    def snapshot(self) -> str:
+        """在事件循环中序列化（很快），写盘交给 write_snapshot 在线程中完成"""
+        self.dirty = False
+        return json.dumps({
+            "enabled": sorted(self.enabled),
+            "disabled": sorted(self.disabled),
+            "characters": self.characters,
+            "texts": dict(heapq.nlargest(self.max_texts, self.texts.items(), key=lambda item: item[1])),
+        }, ensure_ascii=False)
+
+    def write_snapshot(self, data: str):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.enabled = set(data.get("enabled", []))
+        self.disabled = set(data.get("disabled", []))
+        self.characters = dict(data.get("characters", {}))
+        self.texts = dict(data.get("texts", {}))
+
+
+@dataclass
+class Speculation:
+    """在 LLM 响应阶段提前开始的合成，由结果装饰阶段认领"""
+    text: str
+    character: Optional[str]
+    task: asyncio.Task
+    started: float = field(default_factory=time.monotonic)
+    claimed: bool = False
+
+
+@dataclass
+class CharacterProfile:
+    """角色配置：模型目录与参考音频"""
+    name: str
+    onnx_model_dir: str
+    ref_audio_path: str
+    ref_audio_text: str = ""
+    memory_mb: float = 0.0  # 预估的服务器内存占用
+
+
+def parse_character_profiles(config: dict) -> Dict[str, CharacterProfile]:
+    """
+    读取角色列表：默认角色来自原有配置项，额外角色每项格式为
+    角色名|ONNX 模型目录|参考音频路径|参考音频文本[|内存MB]
+    """
+    default_memory = float(config.get('character_memory_mb', 500))
+    default = CharacterProfile(
+        name=config.get('character_name', 'misono_mika'),
+        onnx_model_dir=config.get('onnx_model_dir', '/models/misono_mika'),
+        ref_audio_path=config.get('ref_audio_path', '/models/misono_mika/prompt.wav'),
+        ref_audio_text=config.get('ref_audio_text', ''),
+        memory_mb=default_memory
+    )
+    profiles = {default.name: default}
+    for entry in config.get('characters') or []:
+        parts = [part.strip() for part in str(entry).split("|")]
+        if len(parts) < 3 or not parts[0]:
+            logger.warning(f"[GenieTTS] 忽略格式错误的角色配置: {entry}")
+            continue
+        try:
+            memory = float(parts[4]) if len(parts) > 4 and parts[4] else default_memory
+        except ValueError:
+            memory = default_memory
+        profiles[parts[0]] = CharacterProfile(
+            name=parts[0],
+            onnx_model_dir=parts[1],
+            ref_audio_path=parts[2],
+            ref_audio_text=parts[3] if len(parts) > 3 else "",
+            memory_mb=memory
+        )
+    return profiles
+
+
+@dataclass
+class HTTPResult:
+    """TTS 服务器的响应（已读取完整响应体）"""
+    status_code: int
+    content: bytes
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class TTSOverloaded(Exception):
+    """合成任务因过载或排队过久被丢弃，调用方应改为发送文本"""
+
+
+class CircuitOpenError(TTSOverloaded):
+    """TTS 服务熔断中，不再发起请求"""
+
+
+class DeadlineExceeded(Exception):
+    """回复时限已到，调用方应取消进行中的操作并发送文本"""
+
+
+@dataclass
+class StreamProgress:
+    """流式发送的进度：切分出的段落和已作为语音发出的段数"""
+    segments: List[str] = field(default_factory=list)
+    sent: int = 0
+
+    @property
+    def unsent_text(self) -> str:
+        text = ""
+        for segment in self.segments[self.sent:]:
+            sep = " " if text and text[-1].isascii() and segment[0].isascii() else ""
+            text += sep + segment
+        return text
+
+
+class ReplyDeadline:
+    """单条回复的端到端时限；seconds 不大于 0 时不限时"""
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds if seconds > 0 else None
+
+    def remaining(self) -> Optional[float]:
+        return None if self.expires is None else max(0.0, self.expires - time.monotonic())
+
+    async def run(self, awaitable):
+        """在剩余时间内等待；超时时取消被等待的操作并抛出 DeadlineExceeded"""
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            # 操作自身的超时（如 HTTP 读超时）不算作回复超时
+            if self.remaining() != 0:
+                raise
+            raise DeadlineExceeded("回复时限已到") from None
+
+
+class CircuitBreaker:
+    """
+    TTS 服务熔断器
+    closed: 正常请求，统计时间窗口内的失败率；失败率超过阈值后转为 open
+    open: 拒绝所有请求，冷却时间过后转为 half_open
+    half_open: 只放行一个探测请求，成功则 closed，失败则重新 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: float, failure_rate: float, min_requests: int, cooldown: float):
+        self.window = window
+        self.failure_rate = failure_rate
+        self.min_requests = max(1, min_requests)
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0  # 打开次数
+        self._outcomes: deque = deque()  # (时间, 是否成功)
+        self._probing = False
+
+    def _prune(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    @property
+    def current_failure_rate(self) -> float:
+        self._prune(time.monotonic())
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def is_open(self) -> bool:
+        """熔断中且尚未到达冷却时间（此时请求必然被拒绝）"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        """是否允许发起请求"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release(self):
+        """请求被取消、没有结果；若是半开状态的探测请求，让下一个请求重新探测"""
+        if self.state == self.HALF_OPEN:
+            self._probing = False
+
+    def record_success(self):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            logger.info("[GenieTTS] TTS 服务已恢复，熔断器关闭")
+            self.state = self.CLOSED
+            self._outcomes.clear()
+        self._outcomes.append((now, True))
+        self._prune(now)
+
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == self.HALF_OPEN:
+            self._trip(now)
+            return
+        self._outcomes.append((now, False))
+        self._prune(now)
+        if self.state == self.CLOSED and len(self._outcomes) >= self.min_requests \
+                and self.current_failure_rate >= self.failure_rate:
+            self._trip(now)
+
+    def _trip(self, now: float):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._probing = False
+        logger.warning(f"[GenieTTS] TTS 服务失败率过高，熔断 {self.cooldown:.0f}s")
+
+    def describe(self) -> str:
+        names = {self.CLOSED: "✅ 关闭", self.OPEN: "⛔ 打开", self.HALF_OPEN: "🟡 半开"}
+        text = f"{names[self.state]}（失败率 {self.current_failure_rate:.0%}, 熔断 {self.trips} 次"
+        if self.state == self.OPEN:
+            text += f", {max(0.0, self.cooldown - (time.monotonic() - self.opened_at)):.0f}s 后探测"
+        return text + "）"
+
+
+class SynthesisScheduler:
+    """
+    合成调度器
+    每个会话一个队列，各会话轮流出队，全局并发数有上限；优先任务（测试指令、管理员）先于普通任务。
+    队列满时直接拒绝，排队超过 max_wait 的任务在出队时丢弃
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._priority: deque = deque()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.shed_overload = 0
+        self.shed_stale = 0
+        self._waits: deque = deque(maxlen=200)  # 最近任务的排队时间（秒）
+
+    async def submit(self, sid: str, factory, priority: bool = False):
+        """提交任务并等待结果；被丢弃时抛出 TTSOverloaded"""
+        # 能立即开始的任务不经过队列，max_queue 为 0 时表示不排队而不是拒绝所有任务
+        if not priority and self.active >= self.max_concurrency and self.queued >= self.max_queue:
+            self.shed_overload += 1
+            raise TTSOverloaded(f"合成队列已满 ({self.queued})")
+
+        future = asyncio.get_running_loop().create_future()
+        job = (future, factory, time.monotonic(), priority)
+        if priority:
+            self._priority.append(job)
+        else:
+            self._queues.setdefault(sid, deque()).append(job)
+        self.queued += 1
+        self._pump()
+        return await future
+
+    def _next_job(self):
+        if self._priority:
+            return self._priority.popleft()
+        if not self._queues:
+            return None
+        # 轮询：取队首会话的一个任务后把该会话移到末尾
+        sid, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(sid)
+        else:
+            del self._queues[sid]
+        return job
+
+    def _pump(self):
+        while self.active < self.max_concurrency:
+            job = self._next_job()
+            if job is None:
+                return
+            self.queued -= 1
+            future, factory, enqueued, priority = job
+            if future.done():
+                # 等待方已取消
+                continue
+            waited = time.monotonic() - enqueued
+            if not priority and self.max_wait > 0 and waited > self.max_wait:
+                self.shed_stale += 1
+                future.set_exception(TTSOverloaded(f"排队 {waited:.1f}s 已过期"))
+                continue
+
+            self._waits.append(waited)
+            self.active += 1
+            task = asyncio.ensure_future(factory())
+            task.add_done_callback(functools.partial(self._finish, future))
+            future.add_done_callback(lambda f, t=task: t.cancel() if f.cancelled() else None)
+
+    def _finish(self, future: asyncio.Future, task: asyncio.Task):
+        self.active -= 1
+        self.completed += 1
+        if not future.done():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._pump()
+
+    def stats(self) -> Dict[str, float]:
+        waits = sorted(self._waits)
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "sessions": len(self._queues),
+            "completed": self.completed,
+            "shed_overload": self.shed_overload,
+            "shed_stale": self.shed_stale,
+            "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+            "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+
+@dataclass
+class Backend:
+    """一台 Genie TTS 服务器"""
+    url: str
+    healthy: bool = True   # 健康检查是否通过
+    characters: Set[str] = field(default_factory=set)  # 已加载模型和参考音频的角色
+    inflight: int = 0      # 进行中的合成请求数
+    ewma_latency: float = 0.0  # 合成耗时的指数滑动平均（秒）
+    requests: int = 0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.characters)
+
+    def record_latency(self, elapsed: float, alpha: float = 0.3):
+        self.requests += 1
+        self.ewma_latency = elapsed if self.ewma_latency == 0 else alpha * elapsed + (1 - alpha) * self.ewma_latency
+
+
+class BackendPool:
+    """
+    TTS 服务器池
+    least_inflight: 选择进行中请求最少的服务器，相同时选平均耗时较低的；
+    ewma: 选择预计完成时间（(进行中请求数 + 1) × 平均耗时）最短的服务器
+    """
+
+    def __init__(self, urls: List[str], strategy: str = "least_inflight"):
+        self.backends = [Backend(url) for url in urls]
+        self.strategy = strategy
+
+    def available(self, character: Optional[str] = None) -> List[Backend]:
+        """健康且已加载指定角色（不指定时为任意角色）的服务器"""
+        return [b for b in self.backends if b.healthy and (character in b.characters if character else b.ready)]
+
+    def ready_count(self, character: Optional[str] = None) -> int:
+        return len(self.available(character))
+
+    def pick(self, character: Optional[str] = None, exclude: Optional[Backend] = None) -> Optional[Backend]:
+        candidates = [b for b in self.available(character) if b is not exclude]
+        if not candidates:
+            return None
+        if self.strategy == "ewma":
+            return min(candidates, key=lambda b: (b.inflight + 1) * b.ewma_latency)
+        return min(candidates, key=lambda b: (b.inflight, b.ewma_latency))
+
+
+class HourlyTraffic:
+    """
+    按一天中各小时统计的请求量（每个小时取指数滑动平均），用于预测即将到来的活跃时段
+    """
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.expected: List[float] = [0.0] * 24
+        self._slot = int(time.time() // 3600)
+        self._count = 0
+
+    @staticmethod
+    def _hour_of(slot: int) -> int:
+        return time.localtime(slot * 3600).tm_hour
+
+    def _roll(self, now: float):
+        slot = int(now // 3600)
+        if slot <= self._slot:
+            return
+        # 把刚结束的小时计入平均；中间没有请求的小时按 0 计入（最多回溯一天）
+        counts = [self._count] + [0] * min(slot - self._slot - 1, 23)
+        for offset, count in enumerate(counts):
+            hour = self._hour_of(self._slot + offset)
+            self.expected[hour] = self.alpha * count + (1 - self.alpha) * self.expected[hour]
+        self._slot = slot
+        self._count = 0
+
+    def record(self):
+        now = time.time()
+        self._roll(now)
+        self._count += 1
+
+    def expected_at(self, ts: float) -> float:
+        """预测 ts 所在小时的请求量"""
+        self._roll(time.time())
+        return self.expected[self._hour_of(int(ts // 3600))]
+
+
+class ModelLifecycle:
+    """
+    单个角色模型的生命周期：unloaded → loading → ready → unloading → unloaded
+    并发调用方都等待同一个加载任务，不会重复发起 /load_character；
+    等待方被取消不会中断加载，加载/卸载过程被取消时状态回到 unloaded
+    """
+
+    UNLOADED = "unloaded"
+    LOADING = "loading"
+    READY = "ready"
+    UNLOADING = "unloading"
+
+    def __init__(self, name: str, loader: Callable, unloader: Callable):
+        self.name = name
+        self.state = self.UNLOADED
+        self._loader = loader      # async () -> bool
+        self._unloader = unloader  # async () -> None
+        self._task: Optional[asyncio.Task] = None  # 当前进行中的加载或卸载
+
+    async def ensure_ready(self):
+        """等待模型就绪，需要时发起加载；加载失败时抛出异常"""
+        while self.state != self.READY:
+            if self.state == self.UNLOADING:
+                # 等卸载结束后再重新加载
+                await asyncio.shield(self._task)
+                continue
+            if self.state == self.UNLOADED:
+                self.state = self.LOADING
+                self._task = asyncio.ensure_future(self._load())
+                self._task.add_done_callback(self._consume)
+            loading = self.state == self.LOADING
+            await asyncio.shield(self._task)
+            if loading:
+                # 等到的加载已成功；此后即使马上被其他角色挤出也不再循环重载，避免互相挤占
+                return
+
+    async def unload(self):
+        """卸载模型；正在加载时等加载结束后再卸载"""
+        if self.state == self.LOADING:
+            try:
+                await asyncio.shield(self._task)
+            except Exception:
+                return
+        if self.state == self.UNLOADING:
+            await asyncio.shield(self._task)
+            return
+        if self.state != self.READY:
+            return
+        self.state = self.UNLOADING
+        self._task = asyncio.ensure_future(self._unload())
+        self._task.add_done_callback(self._consume)
+        await asyncio.shield(self._task)
+
+    def mark_lost(self):
+        """服务器上的模型已丢失（如服务器重启），下次使用时重新加载"""
+        if self.state == self.READY:
+            self.state = self.UNLOADED
+
+    async def _load(self):
+        try:
+            if not await self._loader():
+                raise Exception(f"角色 {self.name} 加载失败")
+        except BaseException:
+            self.state = self.UNLOADED
+            raise
+        self.state = self.READY
+
+    async def _unload(self):
+        try:
+            await self._unloader()
+        finally:
+            self.state = self.UNLOADED
+
+    @staticmethod
+    def _consume(task: asyncio.Task):
+        # 没有等待方时避免出现未读取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+
+class TTLCache:
+    """有容量上限和过期时间的 LRU 缓存"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(0, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: str, value):
+        if self.maxsize == 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """
+    相同键的并发调用只执行一次，所有等待者共享同一个结果
+    某个等待者被取消不会影响正在执行的任务和其他等待者；所有等待者都取消时任务随之取消
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.coalesced = 0  # 被合并掉的重复调用次数
+
+    async def do(self, key: str, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 最后一个等待者也取消了，结果已无人使用
+            if self._tasks.get(key) is task and self._waiters[key] == 1:
+                task.cancel()
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+            del self._waiters[key]
+        # 所有等待者都已取消时，避免出现未读取异常的警告
+        if not task.cancelled():
+            task.exception()
+
+    def waiter_counts(self) -> Dict[str, int]:
+        """每个进行中的键当前的等待者数量"""
+        return dict(self._waiters)
+
+
+def _solve_linear(a: List[List[float]], b: List[float]) -> List[float]:
+    """高斯消元（部分主元）求解小规模线性方程组"""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if abs(m[col][col]) < 1e-12:
+            raise ValueError("奇异矩阵")
+        for r in range(col + 1, n):
+            factor = m[r][col] / m[col][col]
+            for c in range(col, n + 1):
+                m[r][c] -= factor * m[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (m[r][n] - sum(m[r][c] * x[c] for c in range(r + 1, n))) / m[r][r]
+    return x
+
+
+class SynthesisCostModel:
+    """
+    合成耗时的在线模型
+    特征为文本中汉字、假名、拉丁字母数字和其他字符的个数，用带遗忘因子的岭回归拟合实际的 /tts 耗时，
+    正则项把系数拉向先验值，样本很少时预测接近先验；同时以 EWMA 跟踪预测误差
+    """
+
+    FEATURES = ("base", "han", "kana", "latin", "other")
+    _HAN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+    _KANA_RE = re.compile(r"[\u3040-\u30ff\u31f0-\u31ff\uff66-\uff9f]")
+    _LATIN_RE = re.compile(r"[A-Za-z0-9]")
+
+    def __init__(self, prior: Tuple[float, ...] = (0.3, 0.06, 0.05, 0.015, 0.005),
+                 decay: float = 0.995, ridge: float = 1.0):
+        n = len(self.FEATURES)
+        self.prior = list(prior)
+        self.weights = list(prior)
+        self.decay = decay
+        self.ridge = ridge
+        self._xtx = [[0.0] * n for _ in range(n)]
+        self._xty = [0.0] * n
+        self.samples = 0
+        self.mape = 0.0  # 平均绝对百分比误差（EWMA）
+        self.bias = 0.0  # 平均有符号误差，实际 - 预测（秒，EWMA）
+
+    def features(self, text: str) -> List[float]:
+        han = len(self._HAN_RE.findall(text))
+        kana = len(self._KANA_RE.findall(text))
+        latin = len(self._LATIN_RE.findall(text))
+        return [1.0, han, kana, latin, len(text) - han - kana - latin]
+
+    def predict(self, text: str) -> float:
+        """预测单次 /tts 请求的耗时（秒）"""
+        return max(0.0, sum(w * x for w, x in zip(self.weights, self.features(text))))
+
+    def observe(self, text: str, seconds: float) -> float:
+        """记录一次实际耗时并更新系数，返回更新前的预测值"""
+        x = self.features(text)
+        predicted = max(0.0, sum(w * v for w, v in zip(self.weights, x)))
+        error = seconds - predicted
+        alpha = 0.1 if self.samples >= 10 else 1.0 / (self.samples + 1)
+        self.bias += alpha * (error - self.bias)
+        self.mape += alpha * (abs(error) / max(seconds, 1e-3) - self.mape)
+
+        n = len(x)
+        for i in range(n):
+            self._xty[i] = self._xty[i] * self.decay + x[i] * seconds
+            row = self._xtx[i]
+            for j in range(n):
+                row[j] = row[j] * self.decay + x[i] * x[j]
+        a = [[self._xtx[i][j] + (self.ridge if i == j else 0.0) for j in range(n)] for i in range(n)]
+        b = [self._xty[i] + self.ridge * self.prior[i] for i in range(n)]
+        try:
+            self.weights = _solve_linear(a, b)
+        except ValueError:
+            pass
+        self.samples += 1
+        return predicted
+
+
+class HedgePolicy:
+    """
+    对冲请求策略
+    记录 /tts 实际耗时与耗时模型预测值之比，请求耗时超过“预测值 × 该比值的 P95”仍未返回时再发一份相同的请求；
+    对冲请求数不超过总请求数的 max_ratio，避免服务器整体变慢时成倍放大负载
+    """
+
+    def __init__(self, quantile: float = 0.95, max_ratio: float = 0.1, min_samples: int = 20, window: int = 200):
+        self.quantile = quantile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self._ratios: deque = deque(maxlen=window)
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0  # 对冲请求先于原请求返回的次数
+
+    def record(self, elapsed: float, predicted: float):
+        if predicted > 0:
+            self._ratios.append(elapsed / predicted)
+
+    def delay(self, predicted: float) -> Optional[float]:
+        """发出对冲请求前等待的秒数；样本不足时返回 None（不对冲）"""
+        if len(self._ratios) < self.min_samples or predicted <= 0:
+            return None
+        ratios = sorted(self._ratios)
+        return predicted * ratios[min(len(ratios) - 1, int(len(ratios) * self.quantile))]
+
+    def estimate(self, elapsed: float, predicted: float) -> float:
+        """
+        对冲请求先返回、原请求被取消时，估计原请求本需要的耗时：
+        取已记录比值中超过当前耗时的部分的中位数，没有更慢的样本时返回当前耗时
+        """
+        if predicted <= 0:
+            return elapsed
+        slower = sorted(ratio for ratio in self._ratios if ratio * predicted > elapsed)
+        return predicted * slower[len(slower) // 2] if slower else elapsed
+
+    def allow(self) -> bool:
+        return self.hedged < self.max_ratio * self.requests
+
+    @property
+    def rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    轻量指标：各阶段耗时的滚动分位数（最近 window 次）和带标签的计数器
+    记录本身的开销也会累计，便于确认埋点不影响回复延迟
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, window: int = 1000):
+        self.window = max(1, window)
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, List[float]] = {}  # 阶段 -> [次数, 累计秒数]
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.records = 0
+        self.overhead = 0.0  # 记录指标花费的累计时间（秒）
+
+    def span(self, stage: str) -> _Span:
+        """计时上下文：with metrics.span("reload"): ..."""
+        return _Span(self, stage)
+
+    def observe(self, stage: str, seconds: float):
+        start = time.perf_counter()
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+            self._totals[stage] = [0, 0.0]
+        samples.append(seconds)
+        total = self._totals[stage]
+        total[0] += 1
+        total[1] += seconds
+        self.records += 1
+        self.overhead += time.perf_counter() - start
+
+    def incr(self, name: str, value: float = 1, **labels: str):
+        start = time.perf_counter()
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + value
+        self.records += 1
+        self.overhead += time.perf_counter() - start
+
+    def gauge(self, name: str, value: float, **labels: str):
+        self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def counter(self, name: str, **labels: str) -> float:
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def counters(self, name: str) -> Dict[Tuple[Tuple[str, str], ...], float]:
+        """某个计数器所有标签组合的值"""
+        return {labels: value for (key, labels), value in self._counters.items() if key == name}
+
+    def percentiles(self, stage: str) -> Dict[float, float]:
+        samples = sorted(self._samples.get(stage, ()))
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(len(samples) * q))] for q in self.QUANTILES}
+
+    def stages(self) -> List[str]:
+        return list(self._samples)
+
+    def span_cost(self, iterations: int = 2000) -> float:
+        """实测一次空 span 的开销（秒），测量样本不计入统计"""
+        probe = Metrics(window=iterations)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            with probe.span("probe"):
+                pass
+        return (time.perf_counter() - start) / iterations
+
+    def to_prometheus(self, prefix: str = "genie_tts") -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = [f"# TYPE {prefix}_stage_seconds summary"]
+        for stage in self._samples:
+            for q, value in self.percentiles(stage).items():
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            count, total = self._totals[stage]
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {count}')
+
+        typed = set()
+        for (name, labels), value in sorted(self._counters.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value:g}" if label_text else f"{prefix}_{name} {value:g}")
+
+        typed = set()
+        for (name, labels), value in sorted(self._gauges.items()):
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                typed.add(name)
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f"{prefix}_{name}{{{label_text}}} {value:g}" if label_text else f"{prefix}_{name} {value:g}")
+
+        lines.append(f"# TYPE {prefix}_metrics_overhead_seconds_total counter")
+        lines.append(f"{prefix}_metrics_overhead_seconds_total {self.overhead:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+class AudioWorkerPool:
+    """
+    音频后处理工作池
+    去静音、响度归一化、WAV 封装等 CPU 密集的阶段在线程池中执行，不阻塞事件循环；
+    排队数量有上限，超出时调用方等待（背压）。mode="inline" 时直接在事件循环中执行，便于对比
+    """
+
+    def __init__(self, workers: int, max_queue: int, mode: str = "thread",
+                 on_stage: Optional[Callable[[str, float], None]] = None):
+        self.mode = mode
+        self.on_stage = on_stage  # 每个阶段完成后回调 (阶段名, 耗时秒数)
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="genie-tts-audio") if mode == "thread" else None
+        self._slots = asyncio.Semaphore(self.workers + max(0, max_queue))
+        self.pending = 0  # 排队 + 执行中的任务数
+        self.loop_blocked = 0.0  # 事件循环被阻塞的累计时间（秒）
+        self._stages: Dict[str, List[float]] = {}  # 阶段 -> [次数, 累计秒数, 最大秒数]
+
+    @staticmethod
+    def _run_stages(data, stages: List[Tuple[str, Callable]]):
+        timings = []
+        for name, fn in stages:
+            start = time.perf_counter()
+            data = fn(data)
+            timings.append((name, time.perf_counter() - start))
+        return data, timings
+
+    async def run(self, data, stages: List[Tuple[str, Callable]]):
+        """依次执行各处理阶段并返回结果"""
+        self.pending += 1
+        try:
+            async with self._slots:
+                start = time.perf_counter()
+                if self._executor is None:
+                    data, timings = self._run_stages(data, stages)
+                    self.loop_blocked += time.perf_counter() - start
+                else:
+                    future = asyncio.get_running_loop().run_in_executor(self._executor, self._run_stages, data, stages)
+                    self.loop_blocked += time.perf_counter() - start
+                    data, timings = await future
+        finally:
+            self.pending -= 1
+
+        for name, elapsed in timings:
+            stat = self._stages.setdefault(name, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+            if self.on_stage:
+                self.on_stage(name, elapsed)
+        return data
+
+    def stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """各阶段的次数、平均和最大耗时（毫秒）"""
+        return {
+            name: {"count": count, "avg_ms": total / count * 1000, "max_ms": peak * 1000}
+            for name, (count, total, peak) in self._stages.items()
+        }
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class AudioCache:
+    """
+    合成音频缓存（内容寻址）
+    内存层与磁盘层各自有字节预算，按 LRU 淘汰；磁盘层位于 temp_dir 下的子目录，
+    不会被临时文件清理任务删除，插件重启后可继续使用
+    条目键即文件名（内容哈希 + 扩展名），同一段语音的 WAV 原始版本和编码版本并存
+    """
+
+    def __init__(self, cache_dir: str, memory_budget: int, disk_budget: int):
+        self.cache_dir = cache_dir
+        self.memory_budget = max(0, memory_budget)
+        self.disk_budget = max(0, disk_budget)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(character_name: str, variant: tuple, text: str) -> str:
+        """根据角色、影响音频内容的参数（参考音频、分句、响度归一化、分段间隔等）和文本生成缓存键"""
+        raw = json.dumps([character_name, list(variant), text], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def contains(self, key: str) -> bool:
+        """是否已缓存（不计入命中统计，也不读取内容）"""
+        return key in self._memory or key in self._disk
+
+    def owns(self, path: str) -> bool:
+        """判断文件是否属于缓存目录（缓存文件不能被临时文件清理删除）"""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / total if total else 0.0
+
+    def _load_index(self):
+        """扫描磁盘层目录，按修改时间重建 LRU 索引"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if not os.path.isfile(path):
+                continue
+            if name.endswith(".tmp"):
+                # 上次写入中断留下的残留文件
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def get(self, key: str, temp_dir: str) -> Optional[str]:
+        """
+        查询缓存
+        返回: 可直接发送的音频文件路径，未命中返回 None
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            path = self.path_for(key)
+            if key in self._disk and os.path.exists(path):
+                self._disk.move_to_end(key)
+                return path
+            return self._materialize(key, data, temp_dir)
+
+        if key in self._disk:
+            path = self.path_for(key)
+            if os.path.exists(path):
+                self._disk.move_to_end(key)
+                self.disk_hits += 1
+                with open(path, "rb") as f:
+                    self._put_memory(key, f.read())
+                return path
+            self._disk_bytes -= self._disk.pop(key)
+        elif self.disk_budget > 0 and os.path.exists(self.path_for(key)):
+            # 由离线预渲染等其他进程写入的文件，收录进索引
+            path = self.path_for(key)
+            self._add_disk(key, os.path.getsize(path))
+            if key in self._disk:
+                self.disk_hits += 1
+                return path
+
+        self.misses += 1
+        return None
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """读取缓存内容（不计入命中统计），用于从已缓存的 WAV 生成其他格式"""
+        data = self._memory.get(key)
+        if data is not None:
+            return data
+        if key in self._disk:
+            try:
+                with open(self.path_for(key), "rb") as f:
+                    return f.read()
+            except OSError:
+                self._disk_bytes -= self._disk.pop(key)
+        return None
+
+    def put(self, key: str, data: bytes, temp_dir: str) -> str:
+        """
+        将生成的音频放入缓存
+        返回: 可直接发送的文件路径（磁盘层关闭时为普通临时文件）
+        """
+        self._put_memory(key, data)
+        return self._materialize(key, data, temp_dir)
+
+    def _materialize(self, key: str, data: bytes, temp_dir: str) -> str:
+        """内存层命中但磁盘上没有文件时，把字节写回磁盘供发送"""
+        if self.disk_budget > 0 and len(data) <= self.disk_budget:
+            path = self.path_for(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._add_disk(key, len(data))
+            return path
+        # 磁盘层关闭：写成普通临时文件，由清理任务负责删除
+        path = os.path.join(temp_dir, f"tts_{uuid.uuid4().hex}{os.path.splitext(key)[1]}")
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def _put_memory(self, key: str, data: bytes):
+        if len(data) > self.memory_budget:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _add_disk(self, key: str, size: int):
+        old = self._disk.pop(key, None)
+        if old is not None:
+            self._disk_bytes -= old
+        self._disk[key] = size
+        self._disk_bytes += size
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                logger.warning(f"[GenieTTS] 删除缓存文件失败 {key}: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class PhraseCache:
+    """
+    句子级语音缓存
+    以 (角色, 合成参数, 规整后的句子) 为键保存处理后的 PCM，不同回复中重复出现的句子（开场白、口头禅等）直接复用。
+    每个条目记录随时间衰减的命中分数，超出磁盘预算时淘汰分数最低的条目；索引由调用方定期快照到 index.json
+    """
+
+    def __init__(self, cache_dir: str, budget: int, half_life: float):
+        self.cache_dir = cache_dir
+        self.budget = max(0, budget)
+        self.half_life = max(1.0, half_life)
+        self._entries: Dict[str, List[float]] = {}  # 键 -> [字节数, 命中分数, 最后使用时间]
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.dirty = False
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def make_key(character_name: str, variant: tuple, sentence: str) -> str:
+        """variant 为影响音频内容的参数（参考音频、分句、响度归一化等）"""
+        raw = json.dumps([character_name, list(variant), sentence], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pcm")
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _score(self, entry: List[float], now: float) -> float:
+        return entry[1] * 0.5 ** ((now - entry[2]) / self.half_life)
+
+    def _load_index(self):
+        """读取索引并与目录中的文件对齐；索引里没有的文件按零分收录"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".tmp"):
+                os.remove(path)
+                continue
+            if not name.endswith(".pcm"):
+                continue
+            key = name[:-4]
+            size = os.path.getsize(path)
+            _, score, last = index.get(key, (size, 0.0, os.path.getmtime(path)))
+            self._entries[key] = [size, score, last]
+            self._bytes += size
+        if self._bytes > self.budget:
+            self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                with open(self.path_for(key), "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._bytes -= self._entries.pop(key)[0]
+                entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.time()
+        entry[1] = self._score(entry, now) + 1
+        entry[2] = now
+        self.hits += 1
+        self.dirty = True
+        return data
+
+    def put(self, key: str, pcm: bytes):
+        if len(pcm) > self.budget:
+            return
+        path = self.path_for(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pcm)
+        os.replace(tmp_path, path)
+
+        old = self._entries.get(key)
+        if old is not None:
+            self._bytes -= old[0]
+        # 首次合成也算一次使用
+        self._entries[key] = [len(pcm), 1.0, time.time()]
+        self._bytes += len(pcm)
+        self.dirty = True
+        if self._bytes > self.budget:
+            self._evict()
+
+    def _evict(self):
+        """按衰减后的命中分数从低到高淘汰，一次降到预算的 90%，避免每次写入都重新排序"""
+        now = time.time()
+        target = self.budget * 0.9
+        for key in sorted(self._entries, key=lambda k: self._score(self._entries[k], now)):
+            if self._bytes <= target:
+                break
+            self._bytes -= self._entries.pop(key)[0]
+            self.evicted += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                logger.warning(f"[GenieTTS] 删除短语缓存失败 {key}: {e}")
+        self.dirty = True
+
+    def snapshot(self) -> str:
+        self.dirty = False
+        return json.dumps(self._entries)
+
+    def write_snapshot(self, data: str):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "evicted": self.evicted,
+        }
+
+
+class PrerenderManifest:
+    """
+    预渲染清单
+    记录每条文本对应的缓存条目和状态，每完成一批写一次；中断后重新运行会跳过缓存文件仍在的已完成文本
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.items: Dict[str, Dict] = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.items = json.load(f).get("items", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(character: str, text: str) -> str:
+        return hashlib.sha256(json.dumps([character, text], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def is_done(self, key: str, cache: AudioCache, entry: str) -> bool:
+        """已完成、缓存文件仍在，且缓存条目与当前配置下的一致"""
+        item = self.items.get(key)
+        return bool(item and item.get("status") == "done" and item.get("entry") == entry
+                    and os.path.exists(cache.path_for(entry)))
+
+    def mark_done(self, key: str, character: str, text: str, entry: str, size: int):
+        self.items[key] = {"character": character, "text": text, "status": "done", "entry": entry, "bytes": size}
+
+    def mark_failed(self, key: str, character: str, text: str, error: str):
+        self.items[key] = {"character": character, "text": text, "status": "failed", "error": error}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated": time.strftime("%Y-%m-%d %H:%M:%S"), "items": self.items}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
 
 
 @register(
@@ -41,117 +1645,509 @@ class GenieTTSPlugin(Star):
     def __init__(self, context: Context, config: dict):
         super().__init__(context)
         self.config = config
-        self.base_url = f"http://{config.get('server_host', '127.0.0.1')}:{config.get('server_port', 9999)}"
+        host = str(config.get('server_host', '127.0.0.1')).rstrip('/')
+        if not host.startswith(("http://", "https://")):
+            host = f"http://{host}"
+        self.base_url = f"{host}:{config.get('server_port', 9999)}"
         self.character_name = config.get('character_name', 'misono_mika')
         self.initialized = False
         self.temp_dir = os.path.join(os.path.dirname(__file__), "temp_audio")
         
         # 高级控制配置
         self.global_enable: bool = bool(config.get('global_enable', True))
-        self.enabled_sessions: List[str] = []
-        self.disabled_sessions: List[str] = []
         self.prob: float = float(config.get('prob', 1.0))
         self.text_limit: int = int(config.get('text_limit', 200))
+        # 准入：cost 按预测的合成耗时、当前积压和延迟预算决定，limit 按 text_limit 硬性截断
+        self.admission_mode: str = config.get('admission_mode', 'cost')
+        self.reply_latency_budget: float = float(config.get('reply_latency_budget', 20))
+        self.cost_model = SynthesisCostModel()
+        # 单条回复从开始处理到语音就绪的时限，超时后取消进行中的请求并发送文本
+        self.reply_deadline: float = float(config.get('reply_deadline', 30))
+        # 对冲请求：/tts 慢于以往 P95 时向另一台（或同一台）服务器再发一份，取先返回的结果
+        self.hedge = HedgePolicy(max_ratio=float(config.get('hedge_max_ratio', 0.1))) \
+            if config.get('hedge_enable', False) else None
+        self._outstanding_cost = 0.0  # 已接纳但未完成的回复预计占用的合成秒数
         self.cooldown: int = int(config.get('cooldown', 0))
         
-        # 会话状态管理
-        self._session_state: Dict[str, SessionState] = {}
+        # 会话状态管理：开关名单和会话角色定期快照到数据目录，重启后恢复
+        self.sessions = SessionStore(
+            os.path.join(get_astrbot_data_path(), "plugin_data", "astrbot_plugin_genie-tts", "sessions.json"),
+            ttl=float(config.get('session_ttl_hours', 24)) * 3600,
+            max_states=int(config.get('session_max_states', 10000))
+        )
+        self.session_snapshot_interval: float = max(1.0, float(config.get('session_snapshot_interval', 30)))
+        try:
+            self.sessions.load()
+        except Exception as e:
+            logger.warning(f"[GenieTTS] 读取会话快照失败: {e}")
+
+        # 朗读前的文本规整（过滤代码块、URL 和表情）
+        self.normalizer = TextNormalizer(
+            filter_code=bool(config.get('filter_code', True)),
+            filter_emoji=bool(config.get('filter_emoji', True)),
+            filter_url=bool(config.get('filter_url', True))
+        )
+
+        # 各阶段耗时与计数指标，可定期导出为 Prometheus 文本文件
+        self.metrics = Metrics(window=int(config.get('metrics_window', 1000)))
+        self.metrics_file: str = str(config.get('metrics_file', '') or '').strip()
+        self.metrics_export_interval: float = max(1.0, float(config.get('metrics_export_interval', 15)))
+
+        # 客户端分段并发合成
+        self.chunk_enable: bool = bool(config.get('chunk_enable', True))
+        self.chunk_max_chars: int = max(1, int(config.get('chunk_max_chars', 60)))
+        self.chunk_concurrency: int = max(1, int(config.get('chunk_concurrency', 3)))
+        self.chunk_gap_ms: int = max(0, int(config.get('chunk_gap_ms', 150)))
+
+        # 音频后处理工作池与响度归一化
+        self.audio_workers = AudioWorkerPool(
+            workers=int(config.get('audio_workers', 2)),
+            max_queue=int(config.get('audio_max_queue', 16)),
+            mode=config.get('audio_worker_mode', 'thread'),
+            on_stage=self.metrics.observe
+        )
+        self.normalize_enable: bool = bool(config.get('normalize_enable', False))
+        self.normalize_target_lufs: float = float(config.get('normalize_target_lufs', -18.0))
+        self.normalize_peak_db: float = float(config.get('normalize_peak_db', -1.0))
+
+        # 输出编码格式（编码器不可用时回退为 WAV）
+        self.output_format: str = str(config.get('output_format', 'wav')).lower()
+        self.output_bitrate: int = int(config.get('output_bitrate_kbps', 32))
+        if not encoder_available(self.output_format):
+            logger.warning(f"[GenieTTS] 输出格式 {self.output_format} 的编码器不可用，回退为 WAV")
+            self.output_format = "wav"
+        self.encode_stats = {"count": 0, "seconds": 0.0, "wav_bytes": 0, "encoded_bytes": 0}
+
+        # 流式发送：每段合成完成后立即作为单独的语音消息发出
+        self.stream_mode: bool = bool(config.get('stream_mode', False))
+        self.stream_min_chars: int = max(1, int(config.get('stream_min_chars', 20)))
+
+        # 失败重试退避与熔断
+        self.retry_backoff_base: float = float(config.get('retry_backoff_base', 0.5))
+        self.retry_backoff_max: float = float(config.get('retry_backoff_max', 8))
+        self.breaker = CircuitBreaker(
+            window=float(config.get('breaker_window', 60)),
+            failure_rate=float(config.get('breaker_failure_rate', 0.5)),
+            min_requests=int(config.get('breaker_min_requests', 5)),
+            cooldown=float(config.get('breaker_cooldown', 30))
+        )
+
+        # 合成调度（按会话公平排队，过载时改发文本）
+        self.scheduler = SynthesisScheduler(
+            max_concurrency=int(config.get('scheduler_max_concurrency', 4)),
+            max_queue=int(config.get('scheduler_max_queue', 32)),
+            max_wait=float(config.get('scheduler_max_wait', 20))
+        )
+
+        # 翻译：提供商查找结果缓存到配置变化为止，翻译结果按 (提供商, 文本) 缓存
+        self.translation_cache = TTLCache(
+            maxsize=int(config.get('translation_cache_size', 256)),
+            ttl=float(config.get('translation_cache_ttl', 3600))
+        )
+        self._translation_inflight = SingleFlight()
+        self._translation_provider = None
+        self._translation_provider_config: Optional[str] = None
+        self._translation_provider_key = ""
+
+        # 进行中的合成请求（相同请求合并）
+        self._inflight = SingleFlight()
+
+        # 预合成：LLM 响应后立即开始合成，结果装饰阶段直接使用
+        self.speculative_enable: bool = bool(config.get('speculative_enable', False))
+        self._speculations: Dict[int, Speculation] = {}
+        self.speculative_stats = {"started": 0, "hits": 0, "hits_ready": 0, "wasted": 0}
+
+        # 模型生命周期：空闲自动卸载与按历史流量提前预热
+        self.idle_unload_seconds: float = float(config.get('idle_unload_minutes', 0)) * 60
+        self.warmup_enable: bool = bool(config.get('warmup_enable', True))
+        self.warmup_lead_seconds: float = float(config.get('warmup_lead_minutes', 10)) * 60
+        self.warmup_min_requests: float = float(config.get('warmup_min_requests', 3))
+        self.last_model_use_time: float = 0.0
+        self.traffic = HourlyTraffic()
+        self._auto_unloaded = False  # 因空闲被自动卸载（下次使用时自动重新加载）
+        self.lifecycle_stats = {"cold_starts": 0, "reload_seconds": 0.0, "idle_unloads": 0, "warmups": 0}
+
+        # 角色注册表与常驻管理（按会话选择角色，超出上限时卸载最久未使用的角色）
+        self.characters: Dict[str, CharacterProfile] = parse_character_profiles(config)
+        self.resident: "OrderedDict[str, float]" = OrderedDict()  # 已加载角色 -> 预估内存（LRU 顺序）
+        self.max_resident_characters: int = max(1, int(config.get('max_resident_characters', 2)))
+        self.character_memory_budget: float = float(config.get('character_memory_budget_mb', 0))
+        self._lifecycles: Dict[str, ModelLifecycle] = {}
+        self.warmup_text: str = str(config.get('warmup_text', '') or '').strip()
+        self._character_users: Dict[str, int] = {}  # 角色 -> 进行中的合成数（使用中的角色不会被卸载）
+        self._residency_lock = asyncio.Lock()  # 腾出位置和加载串行进行，并发加载不同角色时不会一起越过上限
+
+        # TTS 服务器列表（多台时按负载分配请求）
+        backend_urls = [str(url).strip().rstrip('/') for url in (config.get('backend_urls') or []) if str(url).strip()]
+        self.backends = BackendPool(backend_urls or [self.base_url], strategy=config.get('backend_strategy', 'least_inflight'))
+        self.health_check_interval: float = max(1.0, float(config.get('health_check_interval', 15)))
+        self._want_loaded = True  # 模型是否应处于加载状态（卸载后为 False，任何一次加载成功后恢复为 True）
+
+        # HTTP 连接池配置（所有请求共用一个 keep-alive 会话）
+        self.http_pool_size: int = int(config.get('http_pool_size', 10))
+        self.http_connect_timeout: float = float(config.get('http_connect_timeout', 5))
+        self.http_read_timeout: float = float(config.get('http_read_timeout', 60))
+        self._http_semaphore = asyncio.Semaphore(max(1, int(config.get('http_max_concurrency', 8))))
+        self._http: Optional[aiohttp.ClientSession] = None
         
         # 创建临时音频目录
         os.makedirs(self.temp_dir, exist_ok=True)
+
+        # 合成音频缓存
+        # 句子级短语缓存：只合成未命中的句子，再与缓存的句子拼接
+        self.phrase_cache: Optional[PhraseCache] = None
+        if config.get('phrase_cache_enable', False):
+            self.phrase_cache = PhraseCache(
+                os.path.join(self.temp_dir, "phrases"),
+                budget=int(config.get('phrase_cache_disk_mb', 128)) * 1024 * 1024,
+                half_life=float(config.get('phrase_cache_half_life_hours', 72)) * 3600,
+            )
+
+        self.audio_cache: Optional[AudioCache] = None
+        if config.get('cache_enable', True):
+            self.audio_cache = AudioCache(
+                os.path.join(self.temp_dir, "cache"),
+                memory_budget=int(config.get('cache_memory_mb', 32)) * 1024 * 1024,
+                disk_budget=int(config.get('cache_disk_mb', 256)) * 1024 * 1024,
+            )
         
-        logger.info(f"[GenieTTS] 插件初始化，TTS 服务器: {self.base_url}")
+        logger.info(f"[GenieTTS] 插件初始化，TTS 服务器: {', '.join(b.url for b in self.backends.backends)}")
         logger.info(f"[GenieTTS] 全局开关: {self.global_enable}, 概率: {self.prob}, 长度限制: {self.text_limit}, 冷却: {self.cooldown}s")
         
-        # 异步初始化 TTS 服务器
-        asyncio.create_task(self._initialize_tts())
+        # 异步初始化 TTS 服务器，并定期做健康检查
+        self._get_http()
+        self._init_task = asyncio.create_task(self._initialize_tts())
+        self._health_task = asyncio.create_task(self._health_check_loop())
+        self._lifecycle_task = asyncio.create_task(self._model_lifecycle_loop())
+        self._metrics_task = asyncio.create_task(self._metrics_export_loop()) if self.metrics_file else None
+        self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    def _get_http(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话，不存在或已关闭时重新创建"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.http_pool_size,
+                limit_per_host=self.http_pool_size,
+                keepalive_timeout=60
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.http_connect_timeout,
+                sock_read=self.http_read_timeout
+            )
+            self._http = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self._http
+
+    async def _post(self, backend: Backend, endpoint: str, payload: dict) -> HTTPResult:
+        """向指定的 TTS 服务器发送 POST 请求，受并发上限约束"""
+        async with self._http_semaphore:
+            async with self._get_http().post(f"{backend.url}{endpoint}", json=payload) as response:
+                return HTTPResult(response.status, await response.read())
+
+    def _profile(self, name: Optional[str] = None) -> CharacterProfile:
+        """获取角色配置，未知或为空时返回默认角色"""
+        return self.characters.get(name or "") or self.characters[self.character_name]
 
-    async def _initialize_tts(self):
-        """初始化 TTS 服务器，加载模型和参考音频"""
+    def _lifecycle(self, name: Optional[str] = None) -> ModelLifecycle:
+        """获取角色模型的生命周期状态机"""
+        profile = self._profile(name)
+        lifecycle = self._lifecycles.get(profile.name)
+        if lifecycle is None:
+            lifecycle = ModelLifecycle(
+                profile.name,
+                loader=lambda: self._load_character(profile),
+                unloader=lambda: self._unload_character(profile.name)
+            )
+            self._lifecycles[profile.name] = lifecycle
+        return lifecycle
+
+    async def _initialize_tts(self, name: Optional[str] = None):
+        """在所有 TTS 服务器上加载角色（默认为配置的默认角色）的模型和参考音频"""
+        self._want_loaded = True
+        try:
+            await self._lifecycle(name).ensure_ready()
+        except Exception as e:
+            logger.error(f"[GenieTTS] 初始化失败: {e}")
+
+    async def _load_character(self, profile: CharacterProfile) -> bool:
+        """加载角色到所有服务器，可选地做一次预热合成；返回是否至少一台服务器就绪"""
+        async with self._residency_lock:
+            await self._make_room_for(profile)
+            await asyncio.gather(*(self._initialize_backend(backend, profile) for backend in self.backends.backends))
+            ready = self.backends.ready_count(profile.name)
+            if ready == 0:
+                return False
+            self.resident[profile.name] = profile.memory_mb
+            self.resident.move_to_end(profile.name)
+
+        if self.warmup_text:
+            # 首次推理通常明显慢于后续推理，加载后先合成一次
+            await asyncio.gather(*(
+                self._warmup_backend(backend, profile) for backend in self.backends.available(profile.name)
+            ))
+
+        self.initialized = True
+        # 空闲卸载后按需重新加载时也要恢复，否则重启的服务器不会被健康检查重新初始化
+        self._want_loaded = True
+        # 初始化模型使用时间为当前时间
+        self.last_model_use_time = time.time()
+        logger.info(f"[GenieTTS] 角色 {profile.name} 初始化完成（{ready}/{len(self.backends.backends)} 台服务器就绪），设置最后使用时间: {self.last_model_use_time}")
+        return True
+
+    async def _warmup_backend(self, backend: Backend, profile: CharacterProfile):
+        try:
+            start = time.perf_counter()
+            await self._post(backend, "/tts", {
+                "character_name": profile.name,
+                "text": self.warmup_text,
+                "split_sentence": False
+            })
+            logger.info(f"[GenieTTS] {backend.url} 角色 {profile.name} 预热完成，耗时 {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"[GenieTTS] {backend.url} 预热合成失败: {e}")
+
+    async def _initialize_backend(self, backend: Backend, profile: CharacterProfile):
+        """在一台 TTS 服务器上加载角色模型和参考音频"""
         try:
             # 加载角色模型
             load_payload = {
-                "character_name": self.character_name,
-                "onnx_model_dir": self.config.get('onnx_model_dir', '/models/misono_mika')
+                "character_name": profile.name,
+                "onnx_model_dir": profile.onnx_model_dir
             }
             
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(f"{self.base_url}/load_character", json=load_payload, timeout=30)
-            )
+            response = await self._post(backend, "/load_character", load_payload)
             
             if response.status_code != 200:
-                logger.error(f"[GenieTTS] 模型加载失败: {response.text}")
+                logger.error(f"[GenieTTS] {backend.url} 模型 {profile.name} 加载失败: {response.text}")
                 return
             
-            logger.info(f"[GenieTTS] 模型加载成功: {response.json().get('message', '')}")
+            logger.info(f"[GenieTTS] {backend.url} 模型 {profile.name} 加载成功: {response.json().get('message', '')}")
             
             # 设置参考音频
             ref_audio_payload = {
-                "character_name": self.character_name,
-                "audio_path": self.config.get('ref_audio_path', '/models/misono_mika/prompt.wav'),
-                "audio_text": self.config.get('ref_audio_text', '')
+                "character_name": profile.name,
+                "audio_path": profile.ref_audio_path,
+                "audio_text": profile.ref_audio_text
             }
             
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(f"{self.base_url}/set_reference_audio", json=ref_audio_payload, timeout=30)
-            )
+            response = await self._post(backend, "/set_reference_audio", ref_audio_payload)
             
             if response.status_code != 200:
-                logger.error(f"[GenieTTS] 参考音频设置失败: {response.text}")
+                logger.error(f"[GenieTTS] {backend.url} 参考音频设置失败: {response.text}")
+                return
+            
+            logger.info(f"[GenieTTS] {backend.url} 参考音频设置成功")
+            backend.healthy = True
+            backend.characters.add(profile.name)
+            
+        except Exception as e:
+            logger.error(f"[GenieTTS] {backend.url} 初始化失败: {e}", exc_info=True)
+
+    def _over_residency(self, profile: Optional[CharacterProfile] = None) -> bool:
+        """常驻角色（加上即将加载的 profile）是否超出数量上限或内存预算"""
+        count, memory = len(self.resident), sum(self.resident.values())
+        if profile is not None:
+            if profile.name in self.resident:
+                return False
+            count, memory = count + 1, memory + profile.memory_mb
+        return count > self.max_resident_characters or \
+            (self.character_memory_budget > 0 and memory > self.character_memory_budget)
+
+    async def _make_room_for(self, profile: Optional[CharacterProfile] = None):
+        """
+        按数量上限和内存预算卸载最久未使用且空闲的角色；profile 为即将加载的角色，
+        为空时只把已经超出的部分降回上限。调用方需持有 _residency_lock
+        """
+        while self.resident and self._over_residency(profile):
+            # 正在加载的角色（服务器重启后重新加载）在等待这把锁，不能选作卸载对象
+            victim = next((name for name in self.resident if not self._character_users.get(name)
+                           and self._lifecycle(name).state != ModelLifecycle.LOADING), None)
+            if victim is None:
+                if profile is not None:
+                    logger.warning(f"[GenieTTS] 常驻角色都在使用中，暂时超出上限加载 {profile.name}")
+                return
+            logger.info(f"[GenieTTS] 为{f'加载 {profile.name}' if profile else '回到常驻上限'}卸载最久未使用的角色 {victim}")
+            await self._lifecycle(victim).unload()
+            # 卸载失败时不再重复尝试同一个角色
+            self.resident.pop(victim, None)
+
+    async def _trim_residents(self):
+        """暂时超出上限加载的角色，在其他角色空闲后把常驻数量降回上限"""
+        try:
+            async with self._residency_lock:
+                await self._make_room_for()
+        except Exception as e:
+            logger.error(f"[GenieTTS] 卸载多余的常驻角色失败: {e}", exc_info=True)
+
+    async def _unload_character(self, name: str):
+        """在所有 TTS 服务器上卸载一个角色"""
+        unload_payload = {
+            "character_name": name
+        }
+        for backend in self.backends.backends:
+            if name not in backend.characters:
+                continue
+            try:
+                response = await self._post(backend, "/unload_character", unload_payload)
+                
+                if response.status_code == 200:
+                    logger.info(f"[GenieTTS] {backend.url} 模型 {name} 卸载成功")
+                    backend.characters.discard(name)
+                else:
+                    logger.error(f"[GenieTTS] {backend.url} 模型卸载失败: {response.text}")
+                    
+            except Exception as e:
+                logger.error(f"[GenieTTS] {backend.url} 模型卸载异常: {e}", exc_info=True)
+
+        self.resident.pop(name, None)
+        if not self.resident:
+            self.initialized = False
+            # 重置最后使用时间
+            self.last_model_use_time = 0.0
+
+    async def _unload_model(self):
+        """在所有 TTS 服务器上卸载全部常驻角色"""
+        logger.info(f"[GenieTTS] 开始卸载模型 {', '.join(self.resident) or self.character_name}")
+        self._want_loaded = False
+        for name in list(self.resident):
+            await self._lifecycle(name).unload()
+
+    async def _health_check_loop(self):
+        """定期探测各服务器：掉线的暂停分配请求，恢复后重新加载模型"""
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await asyncio.gather(*(self._probe_backend(backend) for backend in self.backends.backends))
+
+    async def _probe_backend(self, backend: Backend):
+        try:
+            async with self._get_http().get(backend.url, timeout=aiohttp.ClientTimeout(total=5)):
+                # 任何 HTTP 响应都说明服务进程存活
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if backend.healthy:
+                logger.warning(f"[GenieTTS] TTS 服务器 {backend.url} 离线: {e}")
+            backend.healthy = False
+            backend.characters.clear()
+            return
+
+        if not backend.healthy:
+            logger.info(f"[GenieTTS] TTS 服务器 {backend.url} 已恢复")
+            backend.healthy = True
+        if not self._want_loaded:
+            return
+        if not self.resident:
+            # 启动时所有服务器都不可用，恢复后补做初始化
+            await self._initialize_tts()
+            return
+        # 服务器重启后常驻角色需要重新加载；正在加载中的角色由状态机负责
+        for name in list(self.resident):
+            if name not in backend.characters and self._lifecycle(name).state == ModelLifecycle.READY:
+                await self._initialize_backend(backend, self._profile(name))
+
+    async def _reload_model_if_needed(self, character: Optional[str] = None):
+        """
+        确保角色模型已加载；同一角色正在加载时等待同一次加载
+        返回时模型已就绪，加载失败时抛出异常
+        """
+        lifecycle = self._lifecycle(character)
+        if lifecycle.state == ModelLifecycle.READY:
+            if self.backends.ready_count(lifecycle.name) > 0:
+                self.resident.move_to_end(lifecycle.name)
                 return
-            
-            logger.info(f"[GenieTTS] 参考音频设置成功")
-            self.initialized = True
-            # 初始化模型使用时间为当前时间
-            self.last_model_use_time = time.time()
-            logger.info(f"[GenieTTS] 模型初始化完成，设置最后使用时间: {self.last_model_use_time}")
-            
-        except Exception as e:
-            logger.error(f"[GenieTTS] 初始化失败: {e}", exc_info=True)
+            # 所有服务器上的模型都已丢失（服务器重启），需要重新加载
+            lifecycle.mark_lost()
 
-    async def _unload_model(self):
-        """卸载当前模型"""
+        # 只由发起加载的调用方统计冷启动，等待同一次加载的调用方不重复计数
+        starting = lifecycle.state != ModelLifecycle.LOADING
+        cold = starting and not self.initialized
+        if starting:
+            logger.info(f"[GenieTTS] 模型 {lifecycle.name} 未加载，重新初始化")
+        start = time.perf_counter()
+        await lifecycle.ensure_ready()
+        self.last_model_use_time = time.time()
+        self._auto_unloaded = False
+        if cold:
+            self.lifecycle_stats["cold_starts"] += 1
+            self.lifecycle_stats["reload_seconds"] += time.perf_counter() - start
+        logger.debug(f"[GenieTTS] 模型重新加载成功，更新最后使用时间: {self.last_model_use_time}")
+
+    async def _model_lifecycle_loop(self):
+        """
+        模型生命周期管理：空闲超过 idle_unload_minutes 自动卸载；
+        根据各小时的历史流量，在预计活跃前 warmup_lead_minutes 提前加载
+        """
+        while True:
+            await asyncio.sleep(30)
+            try:
+                now = time.time()
+                expected = self.traffic.expected_at(now + self.warmup_lead_seconds)
+                busy_soon = self.warmup_enable and expected >= self.warmup_min_requests
+
+                if self.initialized and self.idle_unload_seconds > 0 \
+                        and now - self.last_model_use_time > self.idle_unload_seconds \
+                        and self.scheduler.active == 0 and not busy_soon:
+                    logger.info(f"[GenieTTS] 模型空闲 {int(now - self.last_model_use_time)}s，自动卸载")
+                    await self._unload_model()
+                    if not self.initialized:
+                        self._auto_unloaded = True
+                        self.lifecycle_stats["idle_unloads"] += 1
+
+                elif not self.initialized and self._auto_unloaded and busy_soon:
+                    logger.info(f"[GenieTTS] 预计即将活跃（{expected:.1f} 次/小时），提前加载模型")
+                    await self._initialize_tts()
+                    if self.initialized:
+                        self._auto_unloaded = False
+                        self.lifecycle_stats["warmups"] += 1
+            except Exception as e:
+                logger.error(f"[GenieTTS] 模型生命周期管理异常: {e}", exc_info=True)
+
+    async def _maintenance_loop(self):
+        """定期淘汰空闲会话状态，并把有变化的会话快照和短语缓存索引批量写盘"""
+        while True:
+            await asyncio.sleep(self.session_snapshot_interval)
+            evicted = self.sessions.evict_idle()
+            if evicted:
+                logger.debug(f"[GenieTTS] 淘汰 {evicted} 个空闲会话状态")
+            for store in self._snapshot_stores():
+                if store.dirty:
+                    await self._write_snapshot(store)
+
+    def _snapshot_stores(self) -> list:
+        return [store for store in (self.sessions, self.phrase_cache) if store is not None]
+
+    async def _write_snapshot(self, store):
+        """在事件循环中序列化，写盘放到线程池，不阻塞消息处理"""
+        data = store.snapshot()
         try:
-            logger.info(f"[GenieTTS] 开始卸载模型 {self.character_name}")
-            unload_payload = {
-                "character_name": self.character_name
-            }
-            
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(f"{self.base_url}/unload_character", json=unload_payload, timeout=30)
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"[GenieTTS] 模型 {self.character_name} 卸载成功")
-                self.initialized = False
-                # 重置最后使用时间
-                self.last_model_use_time = 0.0
-            else:
-                logger.error(f"[GenieTTS] 模型卸载失败: {response.text}")
-                
+            await asyncio.get_running_loop().run_in_executor(None, store.write_snapshot, data)
         except Exception as e:
-            logger.error(f"[GenieTTS] 模型卸载异常: {e}", exc_info=True)
+            store.dirty = True
+            logger.warning(f"[GenieTTS] 保存快照失败: {e}")
 
-    async def _reload_model_if_needed(self):
-        """如果模型未加载则重新加载"""
-        if not self.initialized:
-            logger.info(f"[GenieTTS] 模型 {self.character_name} 未加载，重新初始化")
-            await self._initialize_tts()
-            # 等待初始化完成并更新最后使用时间
-            for _ in range(10):  # 最多等待10秒
-                if self.initialized:
-                    self.last_model_use_time = time.time()
-                    logger.debug(f"[GenieTTS] 模型重新加载成功，更新最后使用时间: {self.last_model_use_time}")
-                    break
-                await asyncio.sleep(1)
+    async def _metrics_export_loop(self):
+        """定期把指标写入 Prometheus 文本文件（可供 node_exporter textfile collector 采集）"""
+        while True:
+            await asyncio.sleep(self.metrics_export_interval)
+            try:
+                self._export_metrics()
+            except Exception as e:
+                logger.warning(f"[GenieTTS] 导出指标失败: {e}")
+
+    def _export_metrics(self):
+        path = self.metrics_file
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(__file__), path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.metrics.to_prometheus())
+        # 先写临时文件再替换，采集方不会读到写了一半的文件
+        os.replace(tmp_path, path)
 
     async def _cleanup_file(self, audio_path: str):
         """异步清理临时音频文件"""
+        if self.audio_cache and self.audio_cache.owns(audio_path):
+            # 缓存文件由缓存自己按 LRU 淘汰
+            return
         try:
             if os.path.exists(audio_path):
                 os.remove(audio_path)
@@ -159,18 +2155,90 @@ class GenieTTSPlugin(Star):
         except Exception as e:
             logger.warning(f"[GenieTTS] Failed to cleanup temp file {audio_path}: {e}")
 
+    def _schedule_cleanup(self, audio_path: str, delay: float = 10):
+        """在消息发出后延迟删除临时音频文件"""
+        async def cleanup_file(path):
+            await asyncio.sleep(delay)
+            await self._cleanup_file(path)
+
+        asyncio.create_task(cleanup_file(audio_path))
+
+    def _supports_streaming(self, event: AstrMessageEvent) -> bool:
+        """当前平台能否在一次回复中发送多条消息"""
+        try:
+            return event.get_platform_name() not in STREAM_UNSUPPORTED_PLATFORMS
+        except Exception:
+            return False
+
+    def _stream_segments(self, text: str) -> List[str]:
+        """按句切分文本，并把过短的段与后一段合并，避免发出过碎的语音"""
+        segments: List[str] = []
+        for chunk in split_text(text, self.chunk_max_chars):
+            if segments and len(segments[-1]) < self.stream_min_chars:
+                sep = " " if segments[-1][-1].isascii() and chunk[0].isascii() else ""
+                segments[-1] += sep + chunk
+            else:
+                segments.append(chunk)
+        # 末段过短时并入前一段
+        if len(segments) > 1 and len(segments[-1]) < self.stream_min_chars:
+            last = segments.pop()
+            sep = " " if segments[-1][-1].isascii() and last[0].isascii() else ""
+            segments[-1] += sep + last
+        return segments or [text]
+
+    async def _stream_audio(self, event: AstrMessageEvent, text: str, character: Optional[str] = None,
+                            progress: Optional[StreamProgress] = None) -> str:
+        """
+        流式合成：各段并发合成，按顺序每完成一段就作为单独的语音消息发出
+        progress 记录已发出的段数，中途失败时调用方只需以文本补发剩余部分
+        返回: 最后一段的音频文件路径（由调用方放回消息链）
+        """
+        segments = self._stream_segments(text)
+        if progress is not None:
+            progress.segments = segments
+        if len(segments) == 1:
+            return await self._generate_audio(segments[0], character)
+
+        logger.info(f"[GenieTTS] 流式模式: 回复切分为 {len(segments)} 段")
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def generate(segment: str) -> str:
+            async with semaphore:
+                return await self._generate_audio(segment, character)
+
+        tasks = [asyncio.ensure_future(generate(segment)) for segment in segments]
+        try:
+            for task in tasks[:-1]:
+                path = await task
+                await event.send(MessageChain([Comp.Record(file=path, url=path)]))
+                self._schedule_cleanup(path)
+                if progress is not None:
+                    progress.sent += 1
+            return await tasks[-1]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    @staticmethod
+    def _replace_plain_text(result, text: str):
+        """用一段文本替换消息链中的所有 Plain 组件（text 为空时只删除）"""
+        indices = [i for i, component in enumerate(result.chain) if isinstance(component, Comp.Plain)]
+        for i in reversed(indices):
+            del result.chain[i]
+        if indices and text:
+            result.chain.insert(indices[0], Comp.Plain(text))
+
     def _clean_text(self, text: str) -> Tuple[str, List[str]]:
         """
-        简单清理文本，仅移除首尾空格
+        按 filter_code / filter_emoji / filter_url 配置规整要朗读的文本
         返回: (清理后的文本, 参考文献列表)
         """
-        references = []
-        cleaned = text.strip()
-        return cleaned, references
+        return self.normalizer.normalize(text)
 
     async def _translate_to_chinese(self, text: str) -> str:
         """
-        使用 LLM 将文本翻译成中文
+        使用 LLM 将文本翻译成中文，相同提供商和文本的结果会被缓存
         返回: 翻译后的中文文本
         """
         try:
@@ -179,36 +2247,66 @@ class GenieTTSPlugin(Star):
             if not provider:
                 logger.warning("[GenieTTS] 没有可用的翻译提供商")
                 return ""
-            
-            prompt = "你是一个专业的翻译助手。请将以下文本翻译成简体中文，只返回翻译结果，不要有任何其他说明：\n\n" + text
-            
-            response = await provider.text_chat(
-                prompt=prompt,
-                session_id=None,
-                contexts=[],
-                image_urls=[],
-                system_prompt=""
-            )
-            
-            if response.role == "assistant":
-                translation = response.completion_text.strip()
-                logger.info(f"[GenieTTS] 翻译完成: {text[:50]}... -> {translation[:50]}...")
-                return translation
-            else:
-                logger.warning("[GenieTTS] LLM 未返回翻译结果")
-                return ""
+
+            cache_key = f"{self._translation_provider_key}\n{text}"
+            cached = self.translation_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"[GenieTTS] 命中翻译缓存: {text[:50]}...")
+                return cached
+
+            with self.metrics.span("translation"):
+                translation = await self._translation_inflight.do(
+                    cache_key, lambda: self._request_translation(provider, text)
+                )
+            if translation:
+                self.translation_cache.set(cache_key, translation)
+            return translation
                 
         except Exception as e:
             logger.error(f"[GenieTTS] 翻译失败: {e}", exc_info=True)
             return ""
 
+    async def _request_translation(self, provider, text: str) -> str:
+        """请求 LLM 翻译"""
+        prompt = "你是一个专业的翻译助手。请将以下文本翻译成简体中文，只返回翻译结果，不要有任何其他说明：\n\n" + text
+        
+        response = await provider.text_chat(
+            prompt=prompt,
+            session_id=None,
+            contexts=[],
+            image_urls=[],
+            system_prompt=""
+        )
+        
+        if response.role == "assistant":
+            translation = response.completion_text.strip()
+            logger.info(f"[GenieTTS] 翻译完成: {text[:50]}... -> {translation[:50]}...")
+            return translation
+        else:
+            logger.warning("[GenieTTS] LLM 未返回翻译结果")
+            return ""
+
     def _get_translation_provider(self):
         """
-        获取用于翻译的提供商
+        获取用于翻译的提供商（结果会被缓存，配置的提供商 ID 变化后重新查找）
         优先级：配置的特定提供商 > 当前默认提供商 > 第一个可用提供商
         """
-        # 1. 尝试使用配置中指定的提供商 ID
         provider_id = self.config.get('translation_provider_id', '').strip()
+        if self._translation_provider is not None and self._translation_provider_config == provider_id:
+            return self._translation_provider
+
+        provider = self._resolve_translation_provider(provider_id)
+        self._translation_provider_config = provider_id
+        self._translation_provider = provider
+        if provider is not None:
+            try:
+                self._translation_provider_key = provider.meta().id
+            except Exception:
+                self._translation_provider_key = provider_id or type(provider).__name__
+        return provider
+
+    def _resolve_translation_provider(self, provider_id: str):
+        # 1. 尝试使用配置中指定的提供商 ID
         if provider_id:
             provider = self.context.get_provider_by_id(provider_id)
             if provider:
@@ -242,11 +2340,23 @@ class GenieTTSPlugin(Star):
             pass
         return f"user_{event.get_sender_id()}"
 
+    def _session_character(self, sid: str) -> str:
+        """会话当前使用的角色"""
+        character = self.sessions.character(sid)
+        if character in self.characters:
+            return character
+        return self.character_name
+
+    def _is_admin(self, event: AstrMessageEvent) -> bool:
+        """发送者是否为管理员（管理员的消息优先合成）"""
+        try:
+            return bool(event.is_admin())
+        except Exception:
+            return False
+
     def _is_session_enabled(self, sid: str) -> bool:
         """检查会话是否启用TTS"""
-        if self.global_enable:
-            return sid not in self.disabled_sessions
-        return sid in self.enabled_sessions
+        return self.sessions.is_enabled(sid, self.global_enable)
 
     def _save_config(self):
         """保存配置到文件"""
@@ -259,42 +2369,25 @@ class GenieTTSPlugin(Star):
         except Exception as e:
             logger.warning(f"[GenieTTS] 保存配置失败: {e}")
 
-    def _trim_silence(self, audio_path: str) -> str:
+    def _audio_variant(self, character: Optional[str], split_sentence: bool) -> tuple:
+        """影响单句音频内容的参数，作为短语缓存键的一部分"""
+        profile = self._profile(character)
+        return (profile.ref_audio_path, bool(split_sentence), self.normalize_enable,
+                self.normalize_target_lufs, self.normalize_peak_db)
+
+    def _cache_entry(self, text: str, character: Optional[str] = None) -> Tuple[str, str]:
         """
-        去除音频开头和结尾的静音部分
-        返回: 处理后的音频文件路径
+        整条回复的音频缓存键；除单句参数外还包含分段拼接的间隔，配置改变后不会再命中旧音频
+        返回: (缓存键, 缓存条目名)
         """
-        if not PYDUB_AVAILABLE:
-            return audio_path
-        
-        try:
-            audio = AudioSegment.from_wav(audio_path)
-            
-            # 检测开头和结尾的静音（低于 -40dB 视为静音）
-            def detect_silence(audio_segment, silence_thresh=-40):
-                return detect_leading_silence(audio_segment, silence_threshold=silence_thresh)
-            
-            start_trim = detect_silence(audio)
-            end_trim = detect_silence(audio.reverse())
-            
-            duration = len(audio)
-            # 保留结尾检测到静音前100毫秒的音频内容
-            silence_keep = 100
-            trimmed = audio[start_trim:duration-end_trim+silence_keep]
-            
-            
-            # 覆盖原文件
-            trimmed.export(audio_path, format="wav")
-            logger.info(f"[GenieTTS] 已去除静音: 开头 {start_trim}ms, 结尾保留静音后{silence_keep}ms")
-            
-            return audio_path
-        except Exception as e:
-            logger.warning(f"[GenieTTS] 去除静音失败: {e}")
-            return audio_path
+        split_sentence = self.config.get('split_sentence', True)
+        variant = self._audio_variant(character, split_sentence) + (self.chunk_gap_ms,)
+        key = AudioCache.make_key(self._profile(character).name, variant, text)
+        return key, f"{key}.{OUTPUT_FORMATS[self.output_format]}"
 
-    async def _generate_audio(self, text: str, retry_count: int = 0) -> str:
+    async def _generate_audio(self, text: str, character: Optional[str] = None) -> str:
         """
-        生成音频文件
+        生成音频文件（character 为空时使用默认角色）
         返回: 音频文件路径
         """
         if not self.initialized:
@@ -303,71 +2396,505 @@ class GenieTTSPlugin(Star):
         if not text or len(text.strip()) == 0:
             raise Exception("文本内容为空")
         
-        max_retries = self.config.get('retry_attempts', 3)
-        
+        split_sentence = self.config.get('split_sentence', True)
+        profile = self._profile(character)
+        key, entry = self._cache_entry(text, character)
+
+        # 命中缓存时直接返回，跳过 HTTP 请求、WAV 写入、去静音和编码
+        if self.audio_cache:
+            cached_path = self.audio_cache.get(entry, self.temp_dir)
+            if cached_path:
+                logger.info(f"[GenieTTS] 命中音频缓存: {cached_path}")
+                return cached_path
+
+        # 相同请求正在合成时等待同一个结果，不再重复请求服务器
+        return await self._inflight.do(entry, lambda: self._synthesize_audio(text, split_sentence, key, profile))
+
+    async def _synthesize_audio(self, text: str, split_sentence: bool, cache_key: str, profile: CharacterProfile) -> str:
+        """
+        合成音频并写入文件，按配置编码为压缩格式
+        返回: 音频文件路径
+        """
+        wav_entry = f"{cache_key}.wav"
+        wav_data = self.audio_cache.get_bytes(wav_entry) if self.audio_cache else None
+        if wav_data is None:
+            # 合成期间该角色不会被其他角色挤出
+            self._character_users[profile.name] = self._character_users.get(profile.name, 0) + 1
+            try:
+                # 排队期间角色可能已被卸载，合成前确保已加载
+                await self._reload_model_if_needed(profile.name)
+                wav_data = await self._synthesize_wav(text, split_sentence, profile.name)
+            finally:
+                self._character_users[profile.name] -= 1
+                if not self._character_users[profile.name]:
+                    del self._character_users[profile.name]
+                    if self._over_residency():
+                        asyncio.create_task(self._trim_residents())
+            if self.output_format == "wav":
+                return self._store_audio(wav_entry, wav_data)
+            if self.audio_cache:
+                # 保留 WAV 原始版本，更换输出格式时无需重新合成
+                self.audio_cache.put(wav_entry, wav_data, self.temp_dir)
+
+        ext = OUTPUT_FORMATS[self.output_format]
+        start = time.perf_counter()
         try:
-            tts_payload = {
-                "character_name": self.character_name,
-                "text": text,
-                "split_sentence": self.config.get('split_sentence', True)
-            }
-            
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: requests.post(f"{self.base_url}/tts", json=tts_payload, timeout=60)
-            )
-            
-            if response.status_code != 200:
-                raise Exception(f"TTS 请求失败: {response.status_code} - {response.text}")
-            
-            raw_audio_data = response.content
-            
-            if len(raw_audio_data) < 1000:  # 音频过短，可能生成失败
-                if retry_count < max_retries:
-                    logger.warning(f"[GenieTTS] 音频过短({len(raw_audio_data)} 字节)，重试 {retry_count + 1}/{max_retries}")
-                    await asyncio.sleep(1)
-                    return await self._generate_audio(text, retry_count + 1)
-                else:
-                    raise Exception(f"音频生成失败: 数据过短({len(raw_audio_data)} 字节)")
-            
-            # 保存为 WAV 文件
-            filename = f"tts_{uuid.uuid4().hex}.wav"
-            filepath = os.path.join(self.temp_dir, filename)
-            
-            # WAV 参数
-            CHANNELS = 1
-            SAMPWIDTH = 2
-            FRAMERATE = 32000
-            
-            with wave.open(filepath, 'wb') as wf:
-                wf.setnchannels(CHANNELS)
-                wf.setsampwidth(SAMPWIDTH)
-                wf.setframerate(FRAMERATE)
-                wf.writeframes(raw_audio_data)
-            
-            logger.info(f"[GenieTTS] 音频生成成功: {filepath} ({len(raw_audio_data)} 字节)")
-            
-            # 去除静音
-            filepath = self._trim_silence(filepath)
-            
-            return filepath
-            
+            encoded = await self.audio_workers.run(wav_data, [
+                ("encode", functools.partial(encode_audio, fmt=self.output_format, bitrate_kbps=self.output_bitrate)),
+            ])
         except Exception as e:
-            if retry_count < max_retries:
-                logger.warning(f"[GenieTTS] 生成失败，重试 {retry_count + 1}/{max_retries}: {e}")
-                await asyncio.sleep(1)
-                return await self._generate_audio(text, retry_count + 1)
+            logger.warning(f"[GenieTTS] 编码 {self.output_format} 失败，改为发送 WAV: {e}")
+            return self._store_audio(wav_entry, wav_data)
+
+        self.encode_stats["count"] += 1
+        self.encode_stats["seconds"] += time.perf_counter() - start
+        self.encode_stats["wav_bytes"] += len(wav_data)
+        self.encode_stats["encoded_bytes"] += len(encoded)
+        return self._store_audio(f"{cache_key}.{ext}", encoded)
+
+    def _store_audio(self, entry: str, data: bytes) -> str:
+        """把音频写入缓存（未启用缓存时写入临时文件）并返回文件路径"""
+        if self.audio_cache:
+            filepath = self.audio_cache.put(entry, data, self.temp_dir)
+        else:
+            filepath = os.path.join(self.temp_dir, f"tts_{uuid.uuid4().hex}{os.path.splitext(entry)[1]}")
+            with open(filepath, "wb") as f:
+                f.write(data)
+        logger.info(f"[GenieTTS] 音频生成成功: {filepath} ({len(data)} 字节)")
+        return filepath
+
+    async def _synthesize_wav(self, text: str, split_sentence: bool, character: str) -> bytes:
+        """
+        请求服务器合成并封装为 WAV
+        长文本先在客户端按句切分，各片段并发合成后按顺序拼接
+        返回: WAV 文件内容
+        """
+        chunks = [text]
+        if self.phrase_cache:
+            pcm_chunks = await self._synthesize_phrases(text, split_sentence, character)
+        else:
+            if self.chunk_enable:
+                chunks = split_text(text, self.chunk_max_chars) or [text]
+            if len(chunks) > 1:
+                logger.info(f"[GenieTTS] 文本切分为 {len(chunks)} 段并发合成")
+            # 每段先单独处理，段间间隔和音量才能保持一致
+            pcm_chunks = await self._run_limited([
+                functools.partial(self._fetch_processed_pcm, chunk, split_sentence, character) for chunk in chunks
+            ])
+
+        # 拼接并在内存中封装 WAV，只写一次文件
+        gap = b"\x00" * (int(SAMPLE_RATE * self.chunk_gap_ms / 1000) * SAMPLE_WIDTH * CHANNELS)
+        return await self.audio_workers.run(pcm_chunks, [
+            ("join", gap.join),
+            ("wav", pcm_to_wav),
+        ])
+
+    async def _run_limited(self, factories: List[Callable]) -> list:
+        """最多 chunk_concurrency 个并发执行，按顺序返回结果；任一失败时取消其余任务"""
+        if len(factories) == 1:
+            return [await factories[0]()]
+        semaphore = asyncio.Semaphore(self.chunk_concurrency)
+
+        async def run(factory: Callable):
+            async with semaphore:
+                return await factory()
+
+        tasks = [asyncio.ensure_future(run(factory)) for factory in factories]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _fetch_processed_pcm(self, text: str, split_sentence: bool, character: str) -> bytes:
+        return await self._process_pcm(await self._fetch_pcm(text, split_sentence, character))
+
+    async def _synthesize_phrases(self, text: str, split_sentence: bool, character: str) -> List[bytes]:
+        """
+        按句查询短语缓存，只合成未命中的句子（同一回复中重复的句子只合成一次）
+        返回: 按原顺序排列的各句 PCM
+        """
+        profile = self._profile(character)
+        variant = self._audio_variant(character, split_sentence)
+        sentences = split_sentences(text) or [text]
+        keys = [PhraseCache.make_key(profile.name, variant, sentence) for sentence in sentences]
+
+        pieces: Dict[str, bytes] = {}
+        missing: Dict[str, str] = {}
+        for key, sentence in zip(keys, sentences):
+            if key in pieces or key in missing:
+                continue
+            pcm = self.phrase_cache.get(key)
+            if pcm is None:
+                missing[key] = sentence
             else:
-                logger.error(f"[GenieTTS] 音频生成失败(已重试{retry_count}次): {e}", exc_info=True)
+                pieces[key] = pcm
+                self.metrics.incr("phrase_chars_saved_total", len(sentence))
+
+        if missing:
+            logger.info(f"[GenieTTS] 短语缓存命中 {len(pieces)} 句，合成 {len(missing)} 句")
+            results = await self._run_limited([
+                functools.partial(self._synthesize_phrase, key, sentence, split_sentence, character)
+                for key, sentence in missing.items()
+            ])
+            pieces.update(zip(missing, results))
+        return [pieces[key] for key in keys]
+
+    async def _synthesize_phrase(self, key: str, sentence: str, split_sentence: bool, character: str) -> bytes:
+        async def synthesize() -> bytes:
+            pcm = await self._fetch_processed_pcm(sentence, split_sentence, character)
+            self.phrase_cache.put(key, pcm)
+            return pcm
+
+        # 不同回复同时合成同一句时只请求一次
+        return await self._inflight.do(f"phrase:{key}", synthesize)
+
+    def _observe_cost(self, text: str, elapsed: float):
+        """用实际耗时更新合成耗时模型，并导出预测误差"""
+        predicted = self.cost_model.observe(text, elapsed)
+        self.metrics.observe("cost_model_abs_error", abs(elapsed - predicted))
+        self.metrics.gauge("cost_model_mape", self.cost_model.mape)
+        self.metrics.gauge("cost_model_bias_seconds", self.cost_model.bias)
+        self.metrics.gauge("cost_model_samples", self.cost_model.samples)
+        for name, weight in zip(SynthesisCostModel.FEATURES, self.cost_model.weights):
+            self.metrics.gauge("cost_model_weight", weight, feature=name)
+        self.metrics.gauge("outstanding_cost_seconds", self._outstanding_cost)
+
+    async def _process_pcm(self, pcm: bytes) -> bytes:
+        """在工作池中对单段 PCM 去静音，并按配置做响度归一化"""
+        stages = [("trim", trim_silence_pcm)]
+        if self.normalize_enable:
+            stages.append(("normalize", functools.partial(
+                normalize_pcm,
+                target_lufs=self.normalize_target_lufs,
+                peak_db=self.normalize_peak_db
+            )))
+        return await self.audio_workers.run(pcm, stages)
+
+    async def _fetch_pcm(self, text: str, split_sentence: bool, character: str) -> bytes:
+        """
+        请求 TTS 服务器合成一段文本，失败时按带抖动的指数退避重试
+        熔断器打开时不再请求服务器，直接抛出 CircuitOpenError
+        返回: 原始 PCM 数据（16bit 单声道 32kHz）
+        """
+        max_retries = self.config.get('retry_attempts', 3)
+        tts_payload = {
+            "character_name": character,
+            "text": text,
+            "split_sentence": split_sentence
+        }
+
+        for attempt in range(max_retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError("TTS 服务熔断中")
+            
+            try:
+                raw_audio_data, elapsed = await self._request_tts(text, character, tts_payload)
+                self.breaker.record_success()
+                self.last_model_use_time = time.time()
+                self.metrics.incr("synthesized_bytes_total", len(raw_audio_data))
+                self._observe_cost(text, elapsed)
+                return raw_audio_data
+                
+            except asyncio.CancelledError:
+                # 回复超时、预合成被丢弃等取消不代表服务异常，但要释放半开状态下的探测名额
+                self.breaker.release()
                 raise
+            except Exception as e:
+                self.breaker.record_failure()
+                if attempt >= max_retries:
+                    logger.error(f"[GenieTTS] 音频生成失败(已重试{attempt}次): {e}", exc_info=True)
+                    raise
+                delay = random.uniform(0, min(self.retry_backoff_max, self.retry_backoff_base * 2 ** attempt))
+                self.metrics.incr("retries_total")
+                logger.warning(f"[GenieTTS] 生成失败，{delay:.2f}s 后重试 {attempt + 1}/{max_retries}: {e}")
+                await asyncio.sleep(delay)
+
+    async def _post_tts(self, backend: Backend, payload: dict) -> Tuple[bytes, float]:
+        """向一台服务器发送一次 /tts 请求，返回 (PCM 数据, 耗时)；响应异常时抛出异常"""
+        backend.inflight += 1
+        start = time.perf_counter()
+        try:
+            response = await self._post(backend, "/tts", payload)
+        except aiohttp.ClientConnectionError:
+            # 连接失败的服务器先摘除，由健康检查负责恢复
+            backend.healthy = False
+            backend.characters.clear()
+            raise
+        finally:
+            backend.inflight -= 1
+        elapsed = time.perf_counter() - start
+        backend.record_latency(elapsed)
+        self.metrics.observe("tts_http", elapsed)
+
+        if response.status_code != 200:
+            raise Exception(f"TTS 请求失败: {response.status_code} - {response.text}")
+        if len(response.content) < 1000:  # 音频过短，可能生成失败
+            raise Exception(f"音频生成失败: 数据过短({len(response.content)} 字节)")
+        return response.content, elapsed
+
+    async def _request_tts(self, text: str, character: str, payload: dict) -> Tuple[bytes, float]:
+        """
+        发送 /tts 请求；启用对冲时，原请求超过对冲延迟仍未返回则向另一台服务器（只有一台时为同一台）再发一份，
+        取先成功的结果。返回 (PCM 数据, 从发出原请求起的耗时)
+        """
+        backend = self.backends.pick(character)
+        if backend is None:
+            raise Exception("没有可用的 TTS 服务器")
+        hedge = self.hedge
+        if hedge is None:
+            return await self._post_tts(backend, payload)
+
+        predicted = self.cost_model.predict(text)
+        delay = hedge.delay(predicted)
+        hedge.requests += 1
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(self._post_tts(backend, payload))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and hedge.allow():
+                hedge.hedged += 1
+                self.metrics.incr("hedges_total")
+                target = self.backends.pick(character, exclude=backend) or backend
+                tasks.append(asyncio.ensure_future(self._post_tts(target, payload)))
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    elapsed = time.perf_counter() - start
+                    self.metrics.observe("tts_request", elapsed)
+                    if task is primary:
+                        hedge.record(elapsed, predicted)
+                        self.metrics.observe("tts_unhedged", elapsed)
+                    else:
+                        hedge.wins += 1
+                        self.metrics.incr("hedge_wins_total")
+                        if not primary.done():
+                            # 原请求随后取消，不对冲时的耗时按已记录的比值估计
+                            self.metrics.observe("tts_unhedged", hedge.estimate(elapsed, predicted))
+                    return task.result()[0], elapsed
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _admission(self, text: str, character: Optional[str] = None) -> Tuple[bool, float, float]:
+        """
+        判断是否为这条回复合成语音
+        返回: (是否接纳, 预计占用的合成秒数, 预计回复延迟秒数)
+        """
+        if self.admission_mode != "cost":
+            return self.text_limit <= 0 or len(text) <= self.text_limit, 0.0, 0.0
+
+        if self.audio_cache and self.audio_cache.contains(self._cache_entry(text, character)[1]):
+            return True, 0.0, 0.0
+
+        chunks = (split_text(text, self.chunk_max_chars) if self.chunk_enable else None) or [text]
+        costs = [self.cost_model.predict(chunk) for chunk in chunks]
+        work = sum(costs)
+        # 分段并发合成时，自身耗时取决于最长的一段和并发度
+        own = max(max(costs), work / min(len(costs), self.chunk_concurrency))
+        queued = self._outstanding_cost / self.scheduler.max_concurrency
+        latency = queued + own
+        return latency <= self.reply_latency_budget, work, latency
+
+    def load_corpus(self, source: str, count: int = 200) -> List[str]:
+        """
+        读取预渲染语料：source 为 "hot" 时取最常合成的文本，否则按每行一条读取文本文件
+        文本按自动 TTS 的方式规整，保证与实际回复的缓存键一致
+        """
+        if source == "hot":
+            raw = self.sessions.frequent_texts(count)
+        else:
+            with open(source, "r", encoding="utf-8") as f:
+                raw = [line for line in f if line.strip()]
+        texts = []
+        for line in raw:
+            text, _ = self._clean_text(line)
+            if len(text) >= 2 and (self.admission_mode == "cost" or self.text_limit <= 0 or len(text) <= self.text_limit):
+                texts.append(text)
+        return list(dict.fromkeys(texts))
+
+    async def prerender(self, texts: List[str], character: Optional[str] = None, concurrency: int = 2,
+                        progress: Optional[Callable[[Dict[str, float]], None]] = None) -> Dict[str, float]:
+        """
+        批量合成文本写入音频缓存，并记录清单（可中断后继续）
+        通过合成调度器以独立会话提交，不会挤占正常回复；progress 在每条完成后收到进度
+        """
+        if not self.audio_cache:
+            raise Exception("未启用音频缓存，预渲染没有意义")
+        name = self._profile(character).name
+        manifest = PrerenderManifest(os.path.join(self.temp_dir, "prerender", "manifest.json"))
+        stats = {"total": len(texts), "done": 0, "skipped": 0, "failed": 0, "bytes": 0,
+                 "rate": 0.0, "eta": 0.0, "elapsed": 0.0}
+        start = time.monotonic()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        overload_retries = 60  # 队列繁忙时每秒重试一次，持续约一分钟仍繁忙则记为失败
+
+        def report():
+            finished = stats["done"] + stats["failed"]
+            stats["elapsed"] = time.monotonic() - start
+            stats["rate"] = finished / stats["elapsed"] if stats["elapsed"] else 0.0
+            remaining = stats["total"] - finished - stats["skipped"]
+            stats["eta"] = remaining / stats["rate"] if stats["rate"] else 0.0
+            if progress:
+                progress(dict(stats))
+
+        async def render(text: str):
+            key = PrerenderManifest.key(name, text)
+            entry = self._cache_entry(text, character)[1]
+            if manifest.is_done(key, self.audio_cache, entry):
+                stats["skipped"] += 1
+                return
+            path: Optional[str] = None
+            error: Optional[Exception] = None
+            async with semaphore:
+                for attempt in range(overload_retries + 1):
+                    try:
+                        await self._reload_model_if_needed(character)
+                        path = await self.scheduler.submit("__prerender__", lambda: self._generate_audio(text, character))
+                        break
+                    except CircuitOpenError as e:
+                        # 熔断期间服务不可用，重试只会空转；记为失败，重新运行时再合成
+                        error = e
+                        break
+                    except TTSOverloaded as e:
+                        # 队列繁忙时让出给正常回复，稍后重试
+                        error = e
+                        if attempt < overload_retries:
+                            await asyncio.sleep(1)
+                    except Exception as e:
+                        error = e
+                        break
+                if path is None:
+                    stats["failed"] += 1
+                    manifest.mark_failed(key, name, text, str(error))
+                    report()
+                    return
+            size = os.path.getsize(path)
+            # 磁盘缓存关闭时返回的是临时文件
+            self._schedule_cleanup(path)
+            stats["done"] += 1
+            stats["bytes"] += size
+            manifest.mark_done(key, name, text, entry, size)
+            if stats["done"] % 20 == 0:
+                manifest.save()
+            report()
+
+        try:
+            await asyncio.gather(*(render(text) for text in texts))
+        finally:
+            manifest.save()
+        report()
+        return stats
+
+    @filter.on_llm_response()
+    async def on_llm_response(self, event: AstrMessageEvent, resp):
+        """预合成：拿到 LLM 回复后立即开始合成，不等待消息链构建完成"""
+        if not self.speculative_enable:
+            return
+        try:
+            self._expire_speculations()
+
+            if not self.initialized and not self._auto_unloaded \
+                    and self._lifecycle().state != ModelLifecycle.LOADING:
+                return
+            if self.breaker.is_open():
+                return
+            if getattr(resp, "role", "assistant") != "assistant":
+                return
+
+            sid = self._sess_id(event)
+            if not self._is_session_enabled(sid):
+                return
+            # 流式发送需要在装饰阶段逐段发出，不做预合成
+            if self.stream_mode and self._supports_streaming(event):
+                return
+
+            text, _ = self._clean_text(getattr(resp, "completion_text", "") or "")
+            if len(text) < 2:
+                return
+
+            state = self.sessions.get(sid)
+            if state and self.cooldown > 0 and (time.time() - state.last_tts_time) < self.cooldown:
+                return
+
+            character = self.sessions.character(sid) or None
+            if not self._admission(text, character)[0]:
+                return
+            async def synthesize() -> str:
+                # 模型启动加载中或因空闲已卸载时，与装饰阶段一样先等待加载完成
+                await self._reload_model_if_needed(character)
+                return await self._generate_audio(text, character)
+
+            task = asyncio.ensure_future(self.scheduler.submit(sid, synthesize, priority=self._is_admin(event)))
+            task.add_done_callback(ModelLifecycle._consume)
+            previous = self._speculations.pop(id(event), None)
+            if previous:
+                self._discard_speculation(previous)
+            self._speculations[id(event)] = Speculation(text=text, character=character, task=task)
+            self.speculative_stats["started"] += 1
+            logger.debug(f"[GenieTTS] 开始预合成: '{text[:50]}...'")
+        except Exception as e:
+            logger.warning(f"[GenieTTS] 预合成启动失败: {e}")
+
+    def _claim_speculation(self, speculation: Optional[Speculation], text: str, character: Optional[str]) -> bool:
+        """装饰阶段的文本和角色与预合成一致时认领其结果"""
+        if not speculation or speculation.text != text or speculation.character != character:
+            return False
+        speculation.claimed = True
+        self.speculative_stats["hits"] += 1
+        if speculation.task.done():
+            self.speculative_stats["hits_ready"] += 1
+        return True
+
+    def _discard_speculation(self, speculation: Speculation):
+        """取消未被使用的预合成；已经完成的则清理其临时文件"""
+        self.speculative_stats["wasted"] += 1
+        task = speculation.task
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled() and task.exception() is None:
+            self._schedule_cleanup(task.result())
+
+    def _expire_speculations(self, max_age: float = 120):
+        """丢弃长时间未被认领的预合成（事件在装饰前被其他插件终止）"""
+        now = time.monotonic()
+        for key, speculation in list(self._speculations.items()):
+            if now - speculation.started > max_age:
+                del self._speculations[key]
+                self._discard_speculation(speculation)
 
     @filter.on_decorating_result()
     async def on_decorating_result(self, event: AstrMessageEvent, *args):
         """在发送消息前，将文本结果转换为语音"""
+        translation_task: Optional[asyncio.Task] = None
+        speculation = self._speculations.pop(id(event), None)
+        started = time.perf_counter()
+        deadline = ReplyDeadline(self.reply_deadline)
+        admitted_cost = 0.0
+        progress = StreamProgress()
+        voiced = False
         try:
-            if not self.initialized:
+            # 启动加载中或因空闲自动卸载的模型会在下面等待加载完成
+            if not self.initialized and not self._auto_unloaded \
+                    and self._lifecycle().state != ModelLifecycle.LOADING:
                 logger.debug("[GenieTTS] 模型未初始化，跳过TTS处理")
+                self.metrics.incr("skips_total", reason="not_initialized")
+                return
+
+            # TTS 服务熔断中时直接发送文本，不增加回复延迟
+            if self.breaker.is_open():
+                logger.debug("[GenieTTS] TTS 服务熔断中，跳过TTS处理")
+                self.metrics.incr("skips_total", reason="breaker_open")
                 return
 
             # 获取会话ID
@@ -376,6 +2903,7 @@ class GenieTTSPlugin(Star):
             # 1. 检查会话是否启用
             if not self._is_session_enabled(sid):
                 logger.info(f"[GenieTTS] 会话 {sid} TTS 未启用，跳过")
+                self.metrics.incr("skips_total", reason="disabled")
                 return
 
             result = event.get_result()
@@ -398,79 +2926,143 @@ class GenieTTSPlugin(Star):
                 pass
 
             # 从 Plain 组件中提取所有文本
-            text_to_convert = ""
-            plain_component_indices = []
-            for i, component in enumerate(result.chain):
-                if isinstance(component, Comp.Plain):
-                    text_to_convert += component.text + " "
-                    plain_component_indices.append(i)
-            
-            text_to_convert = text_to_convert.strip()
+            with self.metrics.span("extract"):
+                text_to_convert = ""
+                plain_component_indices = []
+                for i, component in enumerate(result.chain):
+                    if isinstance(component, Comp.Plain):
+                        text_to_convert += component.text + " "
+                        plain_component_indices.append(i)
+
+                # 代码、链接和表情不朗读，减少服务器的合成量
+                text_to_convert, references = self._clean_text(text_to_convert)
 
             if not text_to_convert or len(text_to_convert) < 2:
                 logger.debug("[GenieTTS] 提取的文本内容过短，跳过TTS处理")
+                self.metrics.incr("skips_total", reason="too_short")
                 return
 
-            # 2. 概率门控
-            if random.random() > self.prob:
-                logger.info(f"[GenieTTS] 概率门控未通过 (prob={self.prob})，跳过")
+            # 2. 冷却机制
+            state = self.sessions.get_or_create(sid)
+            now = time.time()
+            if self.cooldown > 0 and (now - state.last_tts_time) < self.cooldown:
+                logger.info(f"[GenieTTS] 冷却中 ({now - state.last_tts_time:.1f}s < {self.cooldown}s)，跳过")
+                self.metrics.incr("skips_total", reason="cooldown")
                 return
 
-            # 4. 长度限制
-            if self.text_limit > 0 and len(text_to_convert) > self.text_limit:
-                logger.info(f"[GenieTTS] 文本过长 ({len(text_to_convert)} > {self.text_limit})，跳过")
+            # 3. 准入：按预测耗时和当前积压判断能否在延迟预算内完成（limit 模式下为长度限制）
+            character = self.sessions.character(sid) or None
+            admitted, cost, expected = self._admission(text_to_convert, character)
+            if not admitted:
+                if self.admission_mode == "cost":
+                    logger.info(f"[GenieTTS] 预计延迟 {expected:.1f}s 超出预算 {self.reply_latency_budget:g}s，跳过")
+                    self.metrics.incr("skips_total", reason="cost")
+                else:
+                    logger.info(f"[GenieTTS] 文本过长 ({len(text_to_convert)} > {self.text_limit})，跳过")
+                    self.metrics.incr("skips_total", reason="length")
                 return
 
-            # 5. 冷却机制
-            state = self._session_state.setdefault(sid, SessionState())
-            now = time.time()
-            if self.cooldown > 0 and (now - state.last_tts_time) < self.cooldown:
-                logger.info(f"[GenieTTS] 冷却中 ({now - state.last_tts_time:.1f}s < {self.cooldown}s)，跳过")
+            # 4. 概率门控（放在准入之后，跳过统计能区分容量不足和随机未命中）
+            if random.random() > self.prob:
+                logger.info(f"[GenieTTS] 概率门控未通过 (prob={self.prob})，跳过")
+                self.metrics.incr("skips_total", reason="probability")
                 return
 
             logger.info(f"[GenieTTS] 开始处理: '{text_to_convert[:50]}...'")
+            self.traffic.record()
+            admitted_cost = cost
+            self._outstanding_cost += admitted_cost
+
+            # 同时发送翻译时，翻译与模型加载、语音合成并发进行
+            if self.config.get('send_text_with_audio', False):
+                translation_task = asyncio.ensure_future(self._translate_to_chinese(text_to_convert))
 
             # 重新加载模型（如果需要）
-            await self._reload_model_if_needed()
+            with self.metrics.span("reload"):
+                await deadline.run(self._reload_model_if_needed(character))
 
-            # 生成音频
-            audio_path = await self._generate_audio(text_to_convert)
+            # 生成音频（流式模式下先逐段发送，最后一段放回消息链）
+            if self.stream_mode and self._supports_streaming(event):
+                factory = lambda: self._stream_audio(event, text_to_convert, character, progress)
+            else:
+                factory = lambda: self._generate_audio(text_to_convert, character)
+            try:
+                with self.metrics.span("synthesis"):
+                    if self._claim_speculation(speculation, text_to_convert, character):
+                        audio_path = await deadline.run(speculation.task)
+                    else:
+                        audio_path = await deadline.run(
+                            self.scheduler.submit(sid, factory, priority=self._is_admin(event)))
+            except TTSOverloaded as e:
+                logger.info(f"[GenieTTS] 合成繁忙，改为发送文本: {e}")
+                self.metrics.incr("skips_total", reason="overload")
+                if translation_task:
+                    translation_task.cancel()
+                return
 
             # 更新会话状态
             state.last_tts_time = now
             state.last_tts_text = text_to_convert
+            self.sessions.record_text(text_to_convert)
 
-            # 创建一个新的 Record 组件
-            record_component = Comp.Record(file=audio_path, url=audio_path)
+            translation = ""
+            if translation_task:
+                with self.metrics.span("translation_wait"):
+                    try:
+                        translation = await deadline.run(translation_task)
+                    except DeadlineExceeded:
+                        # 语音已经就绪，只放弃翻译
+                        logger.info("[GenieTTS] 翻译超出回复时限，只发送语音")
+                        self.metrics.incr("skips_total", reason="translation_deadline")
 
-            # 用一个 Record 组件替换所有 Plain 组件
-            for i in sorted(plain_component_indices, reverse=True):
-                del result.chain[i]
-            
-            # 在第一个 Plain 组件的位置插入 Record 组件
-            if plain_component_indices:
-                result.chain.insert(plain_component_indices[0], record_component)
-                
-                # 如果配置了同时发送文本，在语音后添加中文翻译
-                if self.config.get('send_text_with_audio', False):
-                    translation = await self._translate_to_chinese(text_to_convert)
+            with self.metrics.span("chain"):
+                # 创建一个新的 Record 组件
+                record_component = Comp.Record(file=audio_path, url=audio_path)
+
+                # 用一个 Record 组件替换所有 Plain 组件
+                for i in sorted(plain_component_indices, reverse=True):
+                    del result.chain[i]
+
+                # 在第一个 Plain 组件的位置插入 Record 组件
+                if plain_component_indices:
+                    result.chain.insert(plain_component_indices[0], record_component)
+
+                    # 如果配置了同时发送文本，在语音后添加中文翻译
+                    position = plain_component_indices[0] + 1
                     if translation:
-                        result.chain.insert(plain_component_indices[0] + 1, Comp.Plain(f"\n[中文翻译]\n{translation}"))
+                        result.chain.insert(position, Comp.Plain(f"\n[中文翻译]\n{translation}"))
+                        position += 1
 
-            # 安排临时文件删除
-            async def cleanup_file(path):
-                await asyncio.sleep(10)
-                try:
-                    if os.path.exists(path):
-                        os.remove(path)
-                        logger.info(f"[GenieTTS] Cleaned up temp file: {path}")
-                except Exception as e:
-                    logger.warning(f"[GenieTTS] Failed to cleanup temp file {path}: {e}")
-            
-            asyncio.create_task(cleanup_file(audio_path))
+                    # 被过滤掉的代码和链接作为参考信息附在后面
+                    if self.config.get('show_references', False) and references:
+                        ref_text = "\n".join(references)
+                        result.chain.insert(position, Comp.Plain(f"\n[参考信息]\n{ref_text}"))
 
+            # 安排临时文件删除（缓存文件会被跳过）
+            self._schedule_cleanup(audio_path)
+            voiced = True
+            self.metrics.incr("voiced_replies_total")
+            self.metrics.observe("reply", time.perf_counter() - started)
+
+        except DeadlineExceeded:
+            # 超时的合成请求已被取消，消息链未修改，回复以文本发送
+            logger.warning(f"[GenieTTS] 语音未能在 {self.reply_deadline:g}s 内就绪，改为发送文本")
+            self.metrics.incr("skips_total", reason="deadline")
+            if translation_task:
+                translation_task.cancel()
         except Exception as e:
+            if translation_task:
+                translation_task.cancel()
+            self.metrics.incr("failures_total")
             logger.error(f"[GenieTTS] Failed to decorate result with TTS audio: {e}", exc_info=True)
+        finally:
+            self._outstanding_cost -= admitted_cost
+            if progress.sent and not voiced:
+                # 流式发送中途失败：已发出的段落不再以文本重复发送，只补发剩余部分
+                self._replace_plain_text(event.get_result(), progress.unsent_text)
+            # 概率门控未通过、会话关闭或文本被其他插件修改时，预合成的结果不再需要
+            if speculation and not speculation.claimed:
+                self._discard_speculation(speculation)
 
     @filter.command("gentts-test")
     async def gentts_test_command(self, event: AstrMessageEvent, text: str = ""):
@@ -487,10 +3079,16 @@ class GenieTTSPlugin(Star):
         yield event.plain_result(f"正在生成语音...")
     
         try:
-            await self._reload_model_if_needed()
+            sid = self._sess_id(event)
+            character = self._session_character(sid)
+            await self._reload_model_if_needed(character)
             self.last_model_use_time = time.time()
         
-            audio_path = await self._generate_audio(cleaned_text)
+            audio_path = await self.scheduler.submit(
+                sid,
+                lambda: self._generate_audio(cleaned_text, character),
+                priority=True
+            )
         
             yield event.chain_result([
                 Comp.Record(file=audio_path, url=audio_path)
@@ -511,24 +3109,14 @@ class GenieTTSPlugin(Star):
     async def gentts_on_command(self, event: AstrMessageEvent):
         """启用当前会话 TTS"""
         sid = self._sess_id(event)
-        if self.global_enable:
-            if sid in self.disabled_sessions:
-                self.disabled_sessions.remove(sid)
-        else:
-            if sid not in self.enabled_sessions:
-                self.enabled_sessions.append(sid)
+        self.sessions.set_enabled(sid, True, self.global_enable)
         yield event.plain_result("✅ 本会话 TTS 已启用")
 
     @filter.command("gentts-off")
     async def gentts_off_command(self, event: AstrMessageEvent):
         """禁用当前会话 TTS"""
         sid = self._sess_id(event)
-        if self.global_enable:
-            if sid not in self.disabled_sessions:
-                self.disabled_sessions.append(sid)
-        else:
-            if sid in self.enabled_sessions:
-                self.enabled_sessions.remove(sid)
+        self.sessions.set_enabled(sid, False, self.global_enable)
         yield event.plain_result("❌ 本会话 TTS 已禁用")
 
     @filter.command("gentts-status")
@@ -538,27 +3126,183 @@ class GenieTTSPlugin(Star):
         enabled = self._is_session_enabled(sid)
         mode = "黑名单模式（默认启用）" if self.global_enable else "白名单模式（默认禁用）"
     
-        state = self._session_state.get(sid)
+        state = self.sessions.get(sid)
         last_tts = ""
         if state and state.last_tts_time > 0:
             elapsed = int(time.time() - state.last_tts_time)
             last_tts = f"\n最后 TTS: {elapsed}秒前"
     
         # 添加当前模型信息
-        current_model = self.character_name if self.initialized else "未加载"
+        character = self._session_character(sid)
+        current_model = f"{character}{'' if character in self.resident else '（未加载）'}"
+        if self.resident:
+            current_model += f"\n📦 已加载角色: {', '.join(self.resident)}"
         
         status = f"""📊 Genie TTS 状态
 
 🔧 全局模式: {mode}
 ⚡ 当前会话: {'✅ 启用' if enabled else '❌ 禁用'}
 🎲 触发概率: {self.prob}
-📏 长度限制: {self.text_limit if self.text_limit > 0 else '无限制'}
+📏 准入: {f'按预测耗时（延迟预算 {self.reply_latency_budget:g}s）' if self.admission_mode == 'cost' else (f'长度限制 {self.text_limit}' if self.text_limit > 0 else '无限制')}
 ⏰ 冷却时间: {self.cooldown}秒{last_tts}
 🎙️ 服务器: {'✅ 就绪' if self.initialized else '❌ 未就绪'}
 🤖 当前模型: {current_model}"""
+
+        if len(self.backends.backends) > 1:
+            for backend in self.backends.backends:
+                state = "✅" if backend.ready else ("🟡 未加载" if backend.healthy else "❌ 离线")
+                status += (
+                    f"\n🖥️ {backend.url}: {state}, 进行中 {backend.inflight}, "
+                    f"平均耗时 {backend.ewma_latency * 1000:.0f}ms, 请求 {backend.requests} 次"
+                )
+
+        life = self.lifecycle_stats
+        avg_reload = life["reload_seconds"] / life["cold_starts"] if life["cold_starts"] else 0.0
+        status += (
+            f"\n🧊 冷启动 {life['cold_starts']} 次（平均重载 {avg_reload:.1f}s）, "
+            f"空闲卸载 {life['idle_unloads']} 次, 提前预热 {life['warmups']} 次"
+        )
+
+        status += f"\n🔌 熔断器: {self.breaker.describe()}"
+
+        sched = self.scheduler.stats()
+        status += (
+            f"\n📥 合成队列: 执行中 {sched['active']}, 排队 {sched['queued']}（{sched['sessions']} 个会话）, "
+            f"等待 平均 {sched['avg_wait']:.1f}s / P95 {sched['p95_wait']:.1f}s, "
+            f"丢弃 {sched['shed_overload']}(过载)/{sched['shed_stale']}(过期)"
+        )
+
+        waiters = self._inflight.waiter_counts()
+        status += f"\n🔀 合并请求: {self._inflight.coalesced} 次, 进行中 {len(waiters)} 个, 等待者 {sum(waiters.values())} 个"
+
+        status += (
+            f"\n👥 会话: 活跃状态 {len(self.sessions)} 个（已淘汰 {self.sessions.evicted}）, "
+            f"启用名单 {len(self.sessions.enabled)}, 禁用名单 {len(self.sessions.disabled)}"
+        )
+
+        if self.speculative_enable:
+            spec = self.speculative_stats
+            started = spec["started"] or 1
+            status += (
+                f"\n🔮 预合成: 启动 {spec['started']}, 命中 {spec['hits']} ({spec['hits'] / started:.0%}, "
+                f"其中已完成 {spec['hits_ready']}), 浪费 {spec['wasted']} ({spec['wasted'] / started:.0%})"
+            )
+
+        stages = self.audio_workers.stage_stats()
+        if stages:
+            timings = ", ".join(f"{name} {stat['avg_ms']:.1f}/{stat['max_ms']:.1f}ms" for name, stat in stages.items())
+            status += (
+                f"\n⚙️ 音频处理(平均/最大): {timings}; 排队 {self.audio_workers.pending}, "
+                f"事件循环阻塞累计 {self.audio_workers.loop_blocked * 1000:.1f}ms"
+            )
+
+        if self.encode_stats["count"]:
+            enc = self.encode_stats
+            status += (
+                f"\n🗜️ 输出编码({self.output_format}): {enc['count']} 次, "
+                f"体积 {enc['encoded_bytes'] / max(1, enc['wav_bytes']):.0%}（节省 {(enc['wav_bytes'] - enc['encoded_bytes']) // 1024}KB）, "
+                f"平均耗时 {enc['seconds'] / enc['count'] * 1000:.0f}ms"
+            )
+
+        if self.config.get('send_text_with_audio', False):
+            trans = self.translation_cache
+            status += f"\n🌐 翻译缓存: {len(trans)} 条, 命中 {trans.hits}, 未命中 {trans.misses}"
+
+        if self.phrase_cache:
+            phrase = self.phrase_cache.stats()
+            status += (
+                f"\n🧩 短语缓存: {phrase['entries']} 句 ({phrase['bytes'] // 1024}KB), "
+                f"命中 {phrase['hits']}/{phrase['hits'] + phrase['misses']} ({phrase['hit_rate']:.0%}), "
+                f"节省 {int(self.metrics.counter('phrase_chars_saved_total'))} 字, 淘汰 {phrase['evicted']}"
+            )
+
+        if self.audio_cache:
+            cache = self.audio_cache.stats()
+            status += (
+                f"\n💾 音频缓存: 命中 {cache['memory_hits']}(内存)/{cache['disk_hits']}(磁盘), "
+                f"未命中 {cache['misses']}, 命中率 {cache['hit_rate']:.0%}, "
+                f"占用 {cache['memory_bytes'] // 1024}KB/{cache['disk_bytes'] // 1024}KB"
+            )
     
         yield event.plain_result(status)
 
+    @filter.command("gentts-stats")
+    async def gentts_stats_command(self, event: AstrMessageEvent):
+        """查看各阶段耗时分位数和计数"""
+        stage_names = {
+            "reply": "整条回复", "extract": "文本提取", "reload": "模型加载", "synthesis": "合成(含排队)",
+            "tts_http": "TTS 请求", "trim": "去静音", "normalize": "响度归一化", "join": "拼接",
+            "wav": "WAV 封装", "encode": "编码", "translation": "翻译", "translation_wait": "等待翻译",
+            "chain": "消息链修改", "cost_model_abs_error": "耗时预测误差",
+            "tts_request": "TTS 请求(含对冲)", "tts_unhedged": "TTS 请求(未对冲，估计)",
+        }
+        lines = ["📊 阶段耗时 (P50 / P95 / P99, 毫秒)"]
+        for stage in self.metrics.stages():
+            pct = self.metrics.percentiles(stage)
+            values = " / ".join(f"{pct[q] * 1000:.1f}" for q in Metrics.QUANTILES)
+            lines.append(f"  {stage_names.get(stage, stage)}: {values}")
+        if len(lines) == 1:
+            lines.append("  暂无数据")
+
+        skips = self.metrics.counters("skips_total")
+        skip_text = ", ".join(f"{dict(labels)['reason']} {int(value)}" for labels, value in skips.items()) or "无"
+        lines.append(
+            f"\n🔢 语音回复 {int(self.metrics.counter('voiced_replies_total'))}, "
+            f"失败 {int(self.metrics.counter('failures_total'))}, 重试 {int(self.metrics.counter('retries_total'))}"
+        )
+        lines.append(f"⏭️ 跳过: {skip_text}")
+        lines.append(f"📦 合成数据: {self.metrics.counter('synthesized_bytes_total') / 1024 / 1024:.1f}MB")
+
+        model = self.cost_model
+        weights = ", ".join(f"{name} {weight:.3f}" for name, weight in zip(SynthesisCostModel.FEATURES, model.weights))
+        lines.append(
+            f"🧮 耗时模型: 样本 {model.samples}, 误差 {model.mape:.0%}, 偏差 {model.bias:+.2f}s, "
+            f"积压 {self._outstanding_cost:.1f}s\n  系数(秒/字): {weights}"
+        )
+
+        if self.hedge:
+            actual = self.metrics.percentiles("tts_request")
+            unhedged = self.metrics.percentiles("tts_unhedged")
+            line = (f"🪁 对冲: 请求 {self.hedge.requests}, 对冲 {self.hedge.hedged} ({self.hedge.rate:.1%}), "
+                    f"对冲先返回 {self.hedge.wins}")
+            if actual and unhedged:
+                line += "\n  P95/P99: " + ", ".join(
+                    f"{unhedged[q] * 1000:.0f} → {actual[q] * 1000:.0f}ms" for q in Metrics.QUANTILES[1:])
+            lines.append(line)
+
+        per_span = self.metrics.span_cost()
+        lines.append(
+            f"⏱️ 埋点开销: 每次约 {per_span * 1e6:.1f}µs, "
+            f"累计 {self.metrics.records} 次 {self.metrics.overhead * 1000:.1f}ms"
+        )
+        if self.metrics_file:
+            lines.append(f"📤 Prometheus 文件: {self.metrics_file}（每 {self.metrics_export_interval:g}s 更新）")
+        yield event.plain_result("\n".join(lines))
+
+    @filter.command("gentts-voice")
+    async def gentts_voice_command(self, event: AstrMessageEvent, name: str = ""):
+        """查看或切换当前会话的语音角色"""
+        sid = self._sess_id(event)
+        name = name.strip()
+        if not name:
+            current = self._session_character(sid)
+            lines = [
+                f"{'👉' if n == current else '▫️'} {n}{'（已加载）' if n in self.resident else ''}"
+                for n in self.characters
+            ]
+            yield event.plain_result("🎙️ 可用角色:\n" + "\n".join(lines) + "\n\n使用 gentts-voice <角色名> 切换，gentts-voice default 恢复默认")
+            return
+
+        if name in ("default", "默认"):
+            self.sessions.set_character(sid, "")
+            yield event.plain_result(f"✅ 本会话已恢复默认角色 {self.character_name}")
+            return
+        if name not in self.characters:
+            yield event.plain_result(f"❌ 未知角色: {name}")
+            return
+        self.sessions.set_character(sid, name)
+        yield event.plain_result(f"✅ 本会话语音角色已切换为 {name}")
+
     @filter.command("gentts-globalon")
     async def gentts_globalon_command(self, event: AstrMessageEvent):
         """全局启用 TTS"""
@@ -586,6 +3330,7 @@ class GenieTTSPlugin(Star):
             yield event.plain_result("🚫 权限不足，仅管理员可操作")
             return
         await self._unload_model()
+        self._auto_unloaded = False
         yield event.plain_result("✅ 模型已卸载")
 
     @filter.command("gentts-load")
@@ -601,8 +3346,65 @@ class GenieTTSPlugin(Star):
         else:
             yield event.plain_result("❌ 模型加载失败")
 
+    @filter.command("gentts-prerender")
+    async def gentts_prerender_command(self, event: AstrMessageEvent, source: str = "hot", count: int = 200):
+        """批量预渲染常用语句到音频缓存（source 为 hot 或语料文件路径）"""
+        if not event.is_admin():
+            yield event.plain_result("🚫 权限不足，仅管理员可操作")
+            return
+        try:
+            texts = self.load_corpus(source, count)
+        except OSError as e:
+            yield event.plain_result(f"❌ 读取语料失败: {e}")
+            return
+        if not texts:
+            yield event.plain_result("ℹ️ 没有可预渲染的文本")
+            return
+
+        character = self._session_character(self._sess_id(event))
+        yield event.plain_result(f"⏳ 开始预渲染 {len(texts)} 条文本（角色 {character}）...")
+        latest: Dict[str, float] = {}
+        task = asyncio.ensure_future(self.prerender(
+            texts, character, int(self.config.get('prerender_concurrency', 2)), progress=latest.update
+        ))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=60)
+            if done:
+                break
+            if latest:
+                yield event.plain_result(
+                    f"⏳ 预渲染进度 {latest['done'] + latest['failed'] + latest['skipped']:.0f}/{latest['total']:.0f}, "
+                    f"{latest['rate']:.2f} 条/s, 预计剩余 {latest['eta']:.0f}s"
+                )
+        try:
+            stats = task.result()
+        except Exception as e:
+            yield event.plain_result(f"❌ 预渲染失败: {e}")
+            return
+        yield event.plain_result(
+            f"✅ 预渲染完成: 新增 {stats['done']:.0f} 条 ({stats['bytes'] / 1024 / 1024:.1f}MB), "
+            f"跳过 {stats['skipped']:.0f} 条, 失败 {stats['failed']:.0f} 条, 用时 {stats['elapsed']:.0f}s"
+        )
+
     async def terminate(self):
-        """插件卸载时清理临时文件"""
+        """插件卸载时关闭连接池并清理临时文件"""
+        self._init_task.cancel()
+        self._health_task.cancel()
+        self._lifecycle_task.cancel()
+        if self._metrics_task:
+            self._metrics_task.cancel()
+        self._maintenance_task.cancel()
+        for store in self._snapshot_stores():
+            if store.dirty:
+                try:
+                    store.write_snapshot(store.snapshot())
+                except Exception as e:
+                    logger.warning(f"[GenieTTS] 保存快照失败: {e}")
+        for speculation in self._speculations.values():
+            speculation.task.cancel()
+        if self._http and not self._http.closed:
+            await self._http.close()
+        self.audio_workers.shutdown()
         try:
             if os.path.exists(self.temp_dir):
                 for file in os.listdir(self.temp_dir):
@@ -0,0 +1,92 @@
+"""
+离线预渲染
+在 AstrBot 根目录下运行，按插件配置连接 Genie TTS 服务器，把语料批量合成并写入插件的音频缓存，
+运行中的插件下次查询缓存时即可直接使用:
+    python data/plugins/astrbot_plugin_genie-tts/prerender.py phrases.txt
+    python data/plugins/astrbot_plugin_genie-tts/prerender.py hot --count 500 --character misono_mika
+语料文件每行一条文本；hot 表示插件记录的最常合成的文本。中断后重新运行同一命令会跳过已完成的文本
+"""
+
+import os
+import sys
+import json
+import asyncio
+import argparse
+import importlib.util
+
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_NAME = "astrbot_plugin_genie-tts"
+
+
+def load_plugin_class():
+    spec = importlib.util.spec_from_file_location("genie_tts_main", os.path.join(PLUGIN_DIR, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.GenieTTSPlugin
+
+
+def load_config(path: str) -> dict:
+    if not os.path.exists(path):
+        print(f"⚠️ 找不到插件配置 {path}，使用默认配置", file=sys.stderr)
+        return {}
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return json.load(f)
+
+
+def print_progress(stats: dict):
+    finished = stats["done"] + stats["failed"] + stats["skipped"]
+    sys.stdout.write(
+        f"\r[{finished:.0f}/{stats['total']:.0f}] 新增 {stats['done']:.0f} 跳过 {stats['skipped']:.0f} "
+        f"失败 {stats['failed']:.0f} | {stats['rate']:.2f} 条/s | 预计剩余 {stats['eta']:.0f}s   "
+    )
+    sys.stdout.flush()
+
+
+async def main(args: argparse.Namespace) -> int:
+    config = load_config(args.config)
+    if args.concurrency:
+        config["prerender_concurrency"] = args.concurrency
+    plugin = load_plugin_class()(None, config)
+    try:
+        for _ in range(int(args.timeout * 10)):
+            if plugin.initialized:
+                break
+            await asyncio.sleep(0.1)
+        else:
+            print("❌ 连接 TTS 服务器或加载模型超时", file=sys.stderr)
+            return 2
+
+        texts = plugin.load_corpus(args.source, args.count)
+        if not texts:
+            print("ℹ️ 没有可预渲染的文本")
+            return 0
+        print(f"⏳ 预渲染 {len(texts)} 条文本...")
+        stats = await plugin.prerender(
+            texts,
+            args.character or None,
+            int(config.get("prerender_concurrency", 2)),
+            progress=print_progress,
+        )
+        print(
+            f"\n✅ 完成: 新增 {stats['done']:.0f} 条 ({stats['bytes'] / 1024 / 1024:.1f}MB), "
+            f"跳过 {stats['skipped']:.0f} 条, 失败 {stats['failed']:.0f} 条, 用时 {stats['elapsed']:.0f}s"
+        )
+        return 1 if stats["failed"] else 0
+    finally:
+        await plugin.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genie TTS 离线预渲染")
+    parser.add_argument("source", help="语料文件路径，或 hot 表示最常合成的文本")
+    parser.add_argument("--count", type=int, default=200, help="source 为 hot 时取前多少条")
+    parser.add_argument("--character", default="", help="角色名（默认使用配置中的默认角色）")
+    parser.add_argument("--concurrency", type=int, default=0, help="并发合成数（默认读取 prerender_concurrency）")
+    parser.add_argument("--config", default=os.path.join("data", "config", f"{PLUGIN_NAME}_config.json"),
+                        help="插件配置文件（默认读取 AstrBot 的插件配置）")
+    parser.add_argument("--timeout", type=float, default=60, help="等待模型加载的秒数")
+    try:
+        sys.exit(asyncio.run(main(parser.parse_args())))
+    except KeyboardInterrupt:
+        print("\n⏹️ 已中断，重新运行同一命令可继续")
+        sys.exit(130)
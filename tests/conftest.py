@@ -0,0 +1,60 @@
+import os
+import sys
+import enum
+import types
+import logging
+
+# main.py 位于插件根目录，以顶层模块的方式导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _install_astrbot_stub():
+    """未安装 AstrBot 时提供 main.py 导入所需的最小接口，测试只覆盖不依赖框架的组件"""
+
+    class _Filter:
+        def __getattr__(self, name):
+            def decorator_factory(*args, **kwargs):
+                return lambda fn: fn
+            return decorator_factory
+
+    class Star:
+        def __init__(self, context=None):
+            self.context = context
+
+    class MessageChain:
+        def __init__(self, chain=None):
+            self.chain = chain or []
+
+    class Plain:
+        def __init__(self, text: str):
+            self.text = text
+
+    class Record:
+        def __init__(self, file=None, url=None):
+            self.file = file
+            self.url = url
+
+    class ResultContentType(enum.Enum):
+        LLM_RESULT = 1
+
+    def module(name: str, **attrs) -> types.ModuleType:
+        mod = types.ModuleType(name)
+        mod.__dict__.update(attrs)
+        sys.modules[name] = mod
+        return mod
+
+    api = module("astrbot.api", logger=logging.getLogger("astrbot"))
+    module("astrbot", api=api)
+    api.event = module("astrbot.api.event", filter=_Filter(), AstrMessageEvent=object,
+                       MessageEventResult=object, MessageChain=MessageChain)
+    api.star = module("astrbot.api.star", Context=object, Star=Star, register=lambda *a, **k: (lambda cls: cls))
+    api.message_components = module("astrbot.api.message_components", Plain=Plain, Record=Record)
+    module("astrbot.core")
+    module("astrbot.core.message")
+    module("astrbot.core.message.message_event_result", ResultContentType=ResultContentType)
+
+
+try:
+    import astrbot.api  # noqa: F401
+except ImportError:
+    _install_astrbot_stub()
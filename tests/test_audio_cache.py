@@ -0,0 +1,86 @@
+import os
+
+from main import AudioCache
+
+
+def make_cache(tmp_path, memory_budget: int = 100, disk_budget: int = 100) -> AudioCache:
+    return AudioCache(str(tmp_path / "cache"), memory_budget, disk_budget)
+
+
+def test_key_depends_on_character_variant_and_text():
+    key = AudioCache.make_key("a", ("ref.wav", True), "你好")
+    assert key == AudioCache.make_key("a", ("ref.wav", True), "你好")
+    assert key != AudioCache.make_key("b", ("ref.wav", True), "你好")
+    assert key != AudioCache.make_key("a", ("ref.wav", False), "你好")
+    assert key != AudioCache.make_key("a", ("ref.wav", True), "你好。")
+
+
+def test_put_then_get_from_memory(tmp_path):
+    cache = make_cache(tmp_path)
+    path = cache.put("k.wav", b"x" * 10, str(tmp_path))
+    assert cache.owns(path)
+    assert cache.contains("k.wav")
+    assert cache.get("k.wav", str(tmp_path)) == path
+    assert cache.get_bytes("k.wav") == b"x" * 10
+    assert (cache.memory_hits, cache.disk_hits, cache.misses) == (1, 0, 0)
+
+
+def test_miss(tmp_path):
+    cache = make_cache(tmp_path)
+    assert cache.get("missing.wav", str(tmp_path)) is None
+    assert cache.misses == 1
+    assert cache.hit_rate == 0.0
+
+
+def test_memory_lru_eviction_falls_back_to_disk(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=20, disk_budget=100)
+    cache.put("a.wav", b"a" * 10, str(tmp_path))
+    cache.put("b.wav", b"b" * 10, str(tmp_path))
+    cache.get("a.wav", str(tmp_path))  # a 变为最近使用
+    cache.put("c.wav", b"c" * 10, str(tmp_path))
+
+    assert set(cache._memory) == {"a.wav", "c.wav"}
+    assert cache.get("b.wav", str(tmp_path)) == cache.path_for("b.wav")
+    assert cache.disk_hits == 1
+
+
+def test_disk_lru_eviction_removes_files(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=0, disk_budget=20)
+    cache.put("a.wav", b"a" * 10, str(tmp_path))
+    cache.put("b.wav", b"b" * 10, str(tmp_path))
+    cache.get("a.wav", str(tmp_path))
+    cache.put("c.wav", b"c" * 10, str(tmp_path))
+
+    assert not cache.contains("b.wav")
+    assert not os.path.exists(cache.path_for("b.wav"))
+    assert cache.contains("a.wav") and cache.contains("c.wav")
+    assert cache.stats()["disk_bytes"] == 20
+
+
+def test_disk_disabled_writes_temp_files(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=100, disk_budget=0)
+    path = cache.put("a.mp3", b"a" * 10, str(tmp_path))
+    assert not cache.owns(path)
+    assert path.endswith(".mp3")
+    assert os.path.dirname(path) == str(tmp_path)
+
+
+def test_index_rebuilt_on_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a.wav", b"a" * 10, str(tmp_path))
+    with open(cache.path_for("b.wav.tmp"), "wb") as f:
+        f.write(b"partial")
+
+    reopened = make_cache(tmp_path)
+    assert reopened.contains("a.wav")
+    assert not os.path.exists(reopened.path_for("b.wav.tmp"))
+    assert reopened.get("a.wav", str(tmp_path)) == reopened.path_for("a.wav")
+    assert reopened.disk_hits == 1
+
+
+def test_picks_up_files_written_by_other_processes(tmp_path):
+    cache = make_cache(tmp_path)
+    with open(cache.path_for("pre.wav"), "wb") as f:
+        f.write(b"p" * 10)
+    assert cache.get("pre.wav", str(tmp_path)) == cache.path_for("pre.wav")
+    assert cache.contains("pre.wav")
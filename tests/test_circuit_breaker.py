@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from main import CircuitBreaker, GenieTTSPlugin
+
+
+def make_breaker(cooldown: float = 0.0) -> CircuitBreaker:
+    return CircuitBreaker(window=60, failure_rate=0.5, min_requests=2, cooldown=cooldown)
+
+
+def trip(breaker: CircuitBreaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_opens_after_failure_rate_exceeded():
+    breaker = make_breaker(cooldown=30)
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    assert not breaker.allow()
+
+
+def test_stays_closed_below_min_requests():
+    breaker = make_breaker()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_half_open_allows_single_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_probe_success_closes():
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens():
+    breaker = make_breaker(cooldown=30)
+    trip(breaker)
+    breaker.opened_at -= 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.trips == 2
+
+
+def test_released_probe_lets_next_request_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_does_not_wedge_breaker():
+    breaker = make_breaker()
+    trip(breaker)
+    started = asyncio.Event()
+
+    async def hang(text, character, payload):
+        started.set()
+        await asyncio.sleep(3600)
+
+    plugin = SimpleNamespace(config={"retry_attempts": 0}, breaker=breaker, _request_tts=hang)
+
+    async def run():
+        task = asyncio.ensure_future(GenieTTSPlugin._fetch_pcm(plugin, "テスト", True, "mika"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
@@ -0,0 +1,42 @@
+import pytest
+
+from main import SynthesisCostModel
+
+
+def test_features_count_scripts():
+    model = SynthesisCostModel()
+    assert model.features("你好かなAb1，!") == [1.0, 2, 2, 3, 2]
+
+
+def test_prior_prediction_before_samples():
+    model = SynthesisCostModel(prior=(0.5, 0.1, 0.0, 0.0, 0.0))
+    assert model.predict("你好") == pytest.approx(0.7)
+    assert model.predict("") == pytest.approx(0.5)
+    assert model.samples == 0
+
+
+def test_converges_to_linear_cost():
+    model = SynthesisCostModel()
+    texts = ["你" * n + "a" * m for n in range(1, 30, 3) for m in range(0, 20, 4)]
+    for _ in range(20):
+        for text in texts:
+            model.observe(text, 0.2 + 0.1 * text.count("你") + 0.02 * text.count("a"))
+    assert model.predict("你" * 40) == pytest.approx(4.2, rel=0.05)
+    assert model.predict("你" * 10 + "a" * 50) == pytest.approx(2.2, rel=0.05)
+    assert model.mape < 0.05
+    assert abs(model.bias) < 0.05
+
+
+def test_observe_returns_prediction_and_tracks_error():
+    model = SynthesisCostModel(prior=(1.0, 0.0, 0.0, 0.0, 0.0))
+    assert model.observe("你好", 2.0) == pytest.approx(1.0)
+    # 第一个样本直接作为误差均值
+    assert model.bias == pytest.approx(1.0)
+    assert model.mape == pytest.approx(0.5)
+    assert model.samples == 1
+    assert model.predict("你好") > 1.0
+
+
+def test_prediction_is_never_negative():
+    model = SynthesisCostModel(prior=(-1.0, 0.0, 0.0, 0.0, 0.0))
+    assert model.predict("abc") == 0.0
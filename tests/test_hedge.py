@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from main import BackendPool, DeadlineExceeded, GenieTTSPlugin, HedgePolicy, Metrics, ReplyDeadline, SynthesisCostModel
+
+
+def test_deadline_cancels_and_raises():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(ReplyDeadline(0.05).run(slow()))
+    assert cancelled == [True]
+
+
+def test_deadline_reraises_inner_timeout():
+    async def inner_timeout():
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ReplyDeadline(10).run(inner_timeout()))
+
+
+def test_deadline_disabled_when_not_positive():
+    deadline = ReplyDeadline(0)
+    assert deadline.remaining() is None
+
+    async def value():
+        await asyncio.sleep(0.01)
+        return 1
+
+    assert asyncio.run(deadline.run(value())) == 1
+
+
+def test_hedge_delay_needs_samples():
+    policy = HedgePolicy(quantile=0.9, min_samples=10)
+    for _ in range(9):
+        policy.record(1.0, 1.0)
+    assert policy.delay(2.0) is None
+
+    policy.record(3.0, 1.0)
+    # 比值 9 个 1.0 和 1 个 3.0，P90 为 3.0
+    assert policy.delay(2.0) == pytest.approx(6.0)
+    assert policy.delay(0) is None
+
+
+def test_hedge_budget_and_rate():
+    policy = HedgePolicy(max_ratio=0.1)
+    policy.requests = 10
+    assert policy.allow()
+    policy.hedged = 1
+    assert not policy.allow()
+    assert policy.rate == pytest.approx(0.1)
+
+
+def test_hedge_estimate_uses_slower_samples():
+    policy = HedgePolicy()
+    for ratio in (1.0, 2.0, 4.0, 8.0):
+        policy.record(ratio, 1.0)
+    # 已等待 3 秒，比它慢的样本为 4、8，取中位数（偏上）
+    assert policy.estimate(3.0, 1.0) == pytest.approx(8.0)
+    assert policy.estimate(1.5, 1.0) == pytest.approx(4.0)
+    assert policy.estimate(10.0, 1.0) == 10.0
+
+
+def make_plugin(primary_delay: float, hedge_delay: float):
+    plugin = object.__new__(GenieTTSPlugin)
+    plugin.backends = BackendPool(["http://a", "http://b"])
+    for backend in plugin.backends.backends:
+        backend.characters.add("x")
+    plugin.cost_model = SynthesisCostModel()
+    plugin.hedge = HedgePolicy(max_ratio=1.0, min_samples=1)
+    plugin.hedge.record(0.01, plugin.cost_model.predict("text"))
+    plugin.metrics = Metrics()
+    plugin.cancelled = []
+
+    async def post_tts(backend, payload):
+        try:
+            await asyncio.sleep(primary_delay if backend.url == "http://a" else hedge_delay)
+        except asyncio.CancelledError:
+            plugin.cancelled.append(backend.url)
+            raise
+        return backend.url.encode(), 0.0
+
+    plugin._post_tts = post_tts
+    return plugin
+
+
+def test_hedge_win_cancels_primary():
+    plugin = make_plugin(primary_delay=1.0, hedge_delay=0.01)
+
+    async def run():
+        data, _ = await plugin._request_tts("text", "x", {})
+        await asyncio.sleep(0)
+        return data
+
+    assert asyncio.run(run()) == b"http://b"
+    assert plugin.cancelled == ["http://a"]
+    assert plugin.hedge.wins == 1
+    assert plugin.metrics.percentiles("tts_unhedged")
+
+
+def test_primary_win_records_ratio():
+    plugin = make_plugin(primary_delay=0.0, hedge_delay=1.0)
+    assert asyncio.run(plugin._request_tts("text", "x", {}))[0] == b"http://a"
+    assert plugin.hedge.hedged == 0
+    assert len(plugin.hedge._ratios) == 2
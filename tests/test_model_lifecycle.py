@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from main import ModelLifecycle
+
+
+class FakeBackend:
+    def __init__(self, load_ok=True, delay=0.01):
+        self.load_ok = load_ok
+        self.delay = delay
+        self.loads = 0
+        self.unloads = 0
+
+    async def load(self):
+        self.loads += 1
+        await asyncio.sleep(self.delay)
+        return self.load_ok
+
+    async def unload(self):
+        self.unloads += 1
+        await asyncio.sleep(self.delay)
+
+
+def make(backend: FakeBackend) -> ModelLifecycle:
+    return ModelLifecycle("mika", loader=backend.load, unloader=backend.unload)
+
+
+def test_concurrent_callers_share_one_load():
+    backend = FakeBackend()
+    lifecycle = make(backend)
+
+    async def run():
+        await asyncio.gather(*(lifecycle.ensure_ready() for _ in range(5)))
+
+    asyncio.run(run())
+    assert backend.loads == 1
+    assert lifecycle.state == ModelLifecycle.READY
+
+
+def test_failed_load_raises_and_resets_state():
+    backend = FakeBackend(load_ok=False)
+    lifecycle = make(backend)
+
+    async def run():
+        with pytest.raises(Exception):
+            await lifecycle.ensure_ready()
+        assert lifecycle.state == ModelLifecycle.UNLOADED
+        backend.load_ok = True
+        await lifecycle.ensure_ready()
+
+    asyncio.run(run())
+    assert backend.loads == 2
+    assert lifecycle.state == ModelLifecycle.READY
+
+
+def test_cancelled_waiter_does_not_abort_load():
+    backend = FakeBackend(delay=0.05)
+    lifecycle = make(backend)
+
+    async def run():
+        waiter = asyncio.ensure_future(lifecycle.ensure_ready())
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert lifecycle.state == ModelLifecycle.READY
+    assert backend.loads == 1
+
+
+def test_unload_waits_for_load_in_progress():
+    backend = FakeBackend(delay=0.02)
+    lifecycle = make(backend)
+
+    async def run():
+        loading = asyncio.ensure_future(lifecycle.ensure_ready())
+        await asyncio.sleep(0)
+        assert lifecycle.state == ModelLifecycle.LOADING
+        await lifecycle.unload()
+        await loading
+
+    asyncio.run(run())
+    assert backend.loads == 1 and backend.unloads == 1
+    assert lifecycle.state == ModelLifecycle.UNLOADED
+
+
+def test_ensure_ready_during_unload_reloads_afterwards():
+    backend = FakeBackend(delay=0.02)
+    lifecycle = make(backend)
+
+    async def run():
+        await lifecycle.ensure_ready()
+        unloading = asyncio.ensure_future(lifecycle.unload())
+        await asyncio.sleep(0)
+        assert lifecycle.state == ModelLifecycle.UNLOADING
+        await lifecycle.ensure_ready()
+        await unloading
+
+    asyncio.run(run())
+    assert backend.loads == 2 and backend.unloads == 1
+    assert lifecycle.state == ModelLifecycle.READY
+
+
+def test_mark_lost_triggers_reload():
+    backend = FakeBackend()
+    lifecycle = make(backend)
+
+    async def run():
+        await lifecycle.ensure_ready()
+        lifecycle.mark_lost()
+        assert lifecycle.state == ModelLifecycle.UNLOADED
+        await lifecycle.ensure_ready()
+
+    asyncio.run(run())
+    assert backend.loads == 2
@@ -0,0 +1,139 @@
+import asyncio
+import os
+
+import pytest
+
+from main import CharacterProfile, GenieTTSPlugin, Metrics, PhraseCache, SingleFlight
+
+
+def pcm(size: int, fill: bytes = b"\x01") -> bytes:
+    return fill * size
+
+
+def test_put_and_get_round_trip(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=1000, half_life=3600)
+    assert cache.get("a") is None
+    cache.put("a", pcm(100))
+    assert cache.get("a") == pcm(100)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    assert cache.stats()["bytes"] == 100
+    assert not any(name.endswith(".tmp") for name in os.listdir(tmp_path))
+
+
+def test_entry_larger_than_budget_is_not_stored(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=50, half_life=3600)
+    cache.put("big", pcm(100))
+    assert cache.get("big") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_evicts_lowest_score_down_to_ninety_percent(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=400, half_life=3600)
+    for key in "abcd":
+        cache.put(key, pcm(100))
+    # a、c 多次命中，分数高于 b、d
+    for _ in range(3):
+        cache.get("a")
+        cache.get("c")
+    cache.put("e", pcm(100))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 360
+    assert stats["evicted"] == 2
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert not os.path.exists(cache.path_for("b")) and not os.path.exists(cache.path_for("d"))
+
+
+def test_scores_decay_with_half_life(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=1000, half_life=10)
+    entry = [100, 8.0, 0.0]
+    assert cache._score(entry, 10) == pytest.approx(4.0)
+    assert cache._score(entry, 30) == pytest.approx(1.0)
+
+
+def test_load_index_restores_scores_and_adopts_unknown_files(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=1000, half_life=3600)
+    cache.put("a", pcm(100))
+    cache.get("a")
+    cache.write_snapshot(cache.snapshot())
+    assert not cache.dirty
+
+    # 索引里没有的文件按零分收录，残留的临时文件被删除
+    with open(cache.path_for("orphan"), "wb") as f:
+        f.write(pcm(50))
+    with open(os.path.join(tmp_path, "x.pcm.tmp"), "wb") as f:
+        f.write(b"partial")
+
+    reloaded = PhraseCache(str(tmp_path), budget=1000, half_life=3600)
+    assert reloaded.stats()["entries"] == 2 and reloaded.stats()["bytes"] == 150
+    assert reloaded._entries["a"][1] == pytest.approx(cache._entries["a"][1])
+    assert reloaded._entries["orphan"][1] == 0.0
+    assert not os.path.exists(os.path.join(tmp_path, "x.pcm.tmp"))
+
+
+def test_load_index_evicts_when_over_budget(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=1000, half_life=3600)
+    for key in "abc":
+        cache.put(key, pcm(100))
+    reloaded = PhraseCache(str(tmp_path), budget=200, half_life=3600)
+    assert reloaded.stats()["bytes"] <= 180
+
+
+def test_missing_file_counts_as_miss(tmp_path):
+    cache = PhraseCache(str(tmp_path), budget=1000, half_life=3600)
+    cache.put("a", pcm(100))
+    os.remove(cache.path_for("a"))
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def make_plugin(tmp_path, fetched):
+    """只带短语合成路径所需属性的插件实例"""
+    async def fetch(text, split_sentence, character):
+        fetched.append(text)
+        return text.encode("utf-8")
+
+    plugin = object.__new__(GenieTTSPlugin)
+    plugin.config = {}
+    plugin.character_name = "mika"
+    plugin.characters = {"mika": CharacterProfile("mika", "models/mika", "ref/mika.wav")}
+    plugin.normalize_enable = False
+    plugin.normalize_target_lufs = -18.0
+    plugin.normalize_peak_db = -1.0
+    plugin.chunk_concurrency = 2
+    plugin.phrase_cache = PhraseCache(str(tmp_path), budget=1 << 20, half_life=3600)
+    plugin.metrics = Metrics(window=100)
+    plugin._inflight = SingleFlight()
+    plugin._fetch_processed_pcm = fetch
+    return plugin
+
+
+def test_reply_synthesizes_only_uncached_sentences(tmp_path):
+    fetched = []
+    plugin = make_plugin(tmp_path, fetched)
+
+    async def run():
+        first = await plugin._synthesize_phrases("おはよう。元気？おはよう。", True, None)
+        second = await plugin._synthesize_phrases("おはよう。またね。", True, None)
+        return first, second
+
+    first, second = asyncio.run(run())
+    # 句子经过 NFKC 规整，全角问号变为半角
+    assert first == ["おはよう。".encode(), "元気?".encode(), "おはよう。".encode()]
+    assert second == ["おはよう。".encode(), "またね。".encode()]
+    # 重复的句子只合成一次，第二条回复只合成新句子
+    assert fetched == ["おはよう。", "元気?", "またね。"]
+    assert plugin.metrics.counter("phrase_chars_saved_total") == len("おはよう。")
+
+
+def test_phrase_keys_depend_on_synthesis_settings(tmp_path):
+    fetched = []
+    plugin = make_plugin(tmp_path, fetched)
+
+    async def run():
+        await plugin._synthesize_phrases("おはよう。", True, None)
+        plugin.normalize_enable = True
+        await plugin._synthesize_phrases("おはよう。", True, None)
+
+    asyncio.run(run())
+    assert fetched == ["おはよう。", "おはよう。"]
@@ -0,0 +1,78 @@
+import asyncio
+from collections import OrderedDict
+
+from main import BackendPool, CharacterProfile, GenieTTSPlugin
+
+
+def make_plugin(max_resident: int = 1):
+    """只带常驻角色管理所需属性的插件实例，服务器请求用假实现代替"""
+    plugin = object.__new__(GenieTTSPlugin)
+    plugin.character_name = "a"
+    plugin.characters = {name: CharacterProfile(name, f"/m/{name}", f"/m/{name}.wav", memory_mb=100) for name in "abc"}
+    plugin.resident = OrderedDict()
+    plugin.max_resident_characters = max_resident
+    plugin.character_memory_budget = 0
+    plugin._lifecycles = {}
+    plugin._character_users = {}
+    plugin._residency_lock = asyncio.Lock()
+    plugin.warmup_text = ""
+    plugin.backends = BackendPool(["http://tts"])
+    plugin.calls = []
+
+    async def initialize_backend(backend, profile):
+        plugin.calls.append(("load", profile.name))
+        await asyncio.sleep(0.01)
+        backend.characters.add(profile.name)
+
+    async def unload_character(name):
+        plugin.calls.append(("unload", name))
+        await asyncio.sleep(0.01)
+        for backend in plugin.backends.backends:
+            backend.characters.discard(name)
+        plugin.resident.pop(name, None)
+
+    plugin._initialize_backend = initialize_backend
+    plugin._unload_character = unload_character
+    return plugin
+
+
+def test_concurrent_loads_respect_cap():
+    plugin = make_plugin(max_resident=1)
+
+    async def run():
+        await asyncio.gather(plugin._lifecycle("a").ensure_ready(), plugin._lifecycle("b").ensure_ready())
+
+    asyncio.run(run())
+    assert len(plugin.resident) == 1
+    assert plugin.calls.count(("unload", "a")) + plugin.calls.count(("unload", "b")) == 1
+
+
+def test_in_use_character_is_kept_then_trimmed_after_release():
+    plugin = make_plugin(max_resident=1)
+
+    async def run():
+        await plugin._lifecycle("a").ensure_ready()
+        plugin._character_users["a"] = 1
+        # a 在使用中，b 暂时超出上限加载
+        await plugin._lifecycle("b").ensure_ready()
+        assert list(plugin.resident) == ["a", "b"]
+        assert plugin._over_residency()
+
+        del plugin._character_users["a"]
+        await plugin._trim_residents()
+
+    asyncio.run(run())
+    assert list(plugin.resident) == ["b"]
+    assert ("unload", "a") in plugin.calls
+
+
+def test_memory_budget_evicts_least_recently_used():
+    plugin = make_plugin(max_resident=3)
+    plugin.character_memory_budget = 250
+
+    async def run():
+        for name in "abc":
+            await plugin._lifecycle(name).ensure_ready()
+
+    asyncio.run(run())
+    assert list(plugin.resident) == ["b", "c"]
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+
+from main import SynthesisScheduler, TTSOverloaded
+
+
+def job(order, name, gate=None):
+    async def run():
+        if gate is not None:
+            await gate.wait()
+        order.append(name)
+        return name
+    return run
+
+
+def test_respects_max_concurrency():
+    scheduler = SynthesisScheduler(max_concurrency=2, max_queue=10, max_wait=0)
+    running = {"now": 0, "peak": 0}
+
+    async def work():
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+
+    async def run():
+        await asyncio.gather(*(scheduler.submit(f"s{i}", work) for i in range(6)))
+
+    asyncio.run(run())
+    assert running["peak"] == 2
+    assert scheduler.completed == 6
+    assert scheduler.active == 0 and scheduler.queued == 0
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=10, max_wait=0)
+    order = []
+
+    async def run():
+        gate = asyncio.Event()
+        blocker = asyncio.ensure_future(scheduler.submit("x", job(order, "x", gate)))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(scheduler.submit(sid, job(order, f"{sid}{i}")))
+                   for sid, i in [("a", 1), ("a", 2), ("a", 3), ("b", 1), ("b", 2)]]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, *waiters)
+
+    asyncio.run(run())
+    assert order == ["x", "a1", "b1", "a2", "b2", "a3"]
+
+
+def test_priority_jobs_go_first_and_bypass_queue_limit():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=1, max_wait=0)
+    order = []
+
+    async def run():
+        gate = asyncio.Event()
+        blocker = asyncio.ensure_future(scheduler.submit("x", job(order, "x", gate)))
+        await asyncio.sleep(0)
+        normal = asyncio.ensure_future(scheduler.submit("a", job(order, "normal")))
+        urgent = asyncio.ensure_future(scheduler.submit("b", job(order, "urgent"), priority=True))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(blocker, normal, urgent)
+
+    asyncio.run(run())
+    assert order == ["x", "urgent", "normal"]
+
+
+def test_rejects_when_queue_full():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=1, max_wait=0)
+
+    async def run():
+        gate = asyncio.Event()
+        blocker = asyncio.ensure_future(scheduler.submit("x", job([], "x", gate)))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(scheduler.submit("a", job([], "a")))
+        await asyncio.sleep(0)
+        with pytest.raises(TTSOverloaded):
+            await scheduler.submit("b", job([], "b"))
+        gate.set()
+        await asyncio.gather(blocker, queued)
+
+    asyncio.run(run())
+    assert scheduler.shed_overload == 1
+
+
+def test_stale_jobs_are_dropped():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=10, max_wait=0.01)
+    order = []
+
+    async def run():
+        gate = asyncio.Event()
+        blocker = asyncio.ensure_future(scheduler.submit("x", job(order, "x", gate)))
+        await asyncio.sleep(0)
+        stale = asyncio.ensure_future(scheduler.submit("a", job(order, "a")))
+        await asyncio.sleep(0.05)
+        gate.set()
+        await blocker
+        with pytest.raises(TTSOverloaded):
+            await stale
+
+    asyncio.run(run())
+    assert order == ["x"]
+    assert scheduler.shed_stale == 1
+
+
+def test_cancelled_waiter_cancels_running_job():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=10, max_wait=0)
+    state = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(scheduler.submit("a", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        # 槽位已释放，后续任务可以运行
+        assert await scheduler.submit("b", job([], "b")) == "b"
+
+    asyncio.run(run())
+    assert state.get("cancelled")
+    assert scheduler.active == 0
+
+
+def test_zero_queue_still_runs_jobs_when_idle():
+    scheduler = SynthesisScheduler(max_concurrency=1, max_queue=0, max_wait=0)
+
+    async def run():
+        assert await scheduler.submit("a", job([], "a")) == "a"
+        gate = asyncio.Event()
+        running = asyncio.ensure_future(scheduler.submit("a", job([], "b", gate)))
+        await asyncio.sleep(0)
+        # 没有空闲槽位时才拒绝
+        with pytest.raises(TTSOverloaded):
+            await scheduler.submit("c", job([], "c"))
+        gate.set()
+        assert await running == "b"
+
+    asyncio.run(run())
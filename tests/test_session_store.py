@@ -0,0 +1,107 @@
+import json
+
+from main import SessionStore
+
+
+def make_store(tmp_path, ttl: float = 60, max_states: int = 3, max_texts: int = 1000) -> SessionStore:
+    return SessionStore(str(tmp_path / "sessions.json"), ttl, max_states, max_texts)
+
+
+def test_get_or_create_reuses_state(tmp_path):
+    store = make_store(tmp_path)
+    assert store.get("s1") is None
+    state = store.get_or_create("s1")
+    state.last_tts_text = "你好"
+    assert store.get_or_create("s1") is state
+    assert len(store) == 1
+
+
+def test_evicts_least_recently_used_over_limit(tmp_path):
+    store = make_store(tmp_path, max_states=2)
+    store.get_or_create("s1")
+    store.get_or_create("s2")
+    store.get("s1")
+    store.get_or_create("s3")
+    assert store.get("s2") is None
+    assert store.get("s1") is not None
+    assert store.evicted == 1
+
+
+def test_evict_idle(tmp_path):
+    store = make_store(tmp_path, ttl=10)
+    store.get_or_create("old").last_seen -= 20
+    store.get_or_create("new")
+    # old 先创建，位于 LRU 队首
+    assert store.evict_idle() == 1
+    assert store.get("old") is None
+    assert store.get("new") is not None
+
+
+def test_enabled_lists(tmp_path):
+    store = make_store(tmp_path)
+    # 黑名单模式：默认启用，关闭的会话记入 disabled
+    store.set_enabled("s1", False, global_enable=True)
+    assert not store.is_enabled("s1", True)
+    assert store.is_enabled("s2", True)
+    assert store.disabled == {"s1"} and store.dirty
+
+    store.dirty = False
+    store.set_enabled("s1", True, global_enable=True)
+    assert store.is_enabled("s1", True)
+    assert store.dirty
+
+    # 白名单模式：默认关闭，启用的会话记入 enabled
+    store.set_enabled("s3", True, global_enable=False)
+    assert store.is_enabled("s3", False)
+    assert not store.is_enabled("s4", False)
+
+    store.dirty = False
+    store.set_enabled("s3", True, global_enable=False)
+    assert not store.dirty
+
+
+def test_character(tmp_path):
+    store = make_store(tmp_path)
+    assert store.character("s1") == ""
+    store.set_character("s1", "mika")
+    assert store.character("s1") == "mika"
+    store.set_character("s1", "")
+    assert "s1" not in store.characters
+
+
+def test_frequent_texts_are_bounded(tmp_path):
+    store = make_store(tmp_path, max_texts=2)
+    for text, count in (("a", 3), ("b", 1), ("c", 2)):
+        for _ in range(count):
+            store.record_text(text)
+    assert store.frequent_texts(2) == ["a", "c"]
+
+    store.record_text("d")
+    store.record_text("e")
+    # 超过 max_texts 的两倍后只保留最常见的部分
+    assert len(store.texts) <= 4
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = make_store(tmp_path)
+    store.set_enabled("s1", False, global_enable=True)
+    store.set_enabled("s2", True, global_enable=False)
+    store.set_character("s1", "mika")
+    store.record_text("你好")
+    data = store.snapshot()
+    assert not store.dirty
+    assert json.loads(data)["texts"] == {"你好": 1}
+    store.write_snapshot(data)
+
+    loaded = make_store(tmp_path)
+    loaded.load()
+    assert loaded.disabled == {"s1"}
+    assert loaded.enabled == {"s2"}
+    assert loaded.character("s1") == "mika"
+    assert loaded.frequent_texts(1) == ["你好"]
+
+
+def test_load_without_file(tmp_path):
+    store = make_store(tmp_path)
+    store.load()
+    assert not store.enabled and not store.disabled
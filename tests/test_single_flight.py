@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from main import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "audio.wav"
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == ["audio.wav"] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+    assert flight.waiter_counts() == {}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        return key
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: work("a")), flight.do("b", lambda: work("b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert calls == ["a", "b"]
+
+
+def test_exception_is_shared_and_key_is_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def ok():
+        return "ok"
+
+    async def run():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        # 失败后不再缓存，下一次调用重新执行
+        return await flight.do("k", ok)
+
+    assert asyncio.run(run()) == "ok"
+
+
+def test_cancelled_waiter_does_not_cancel_shared_task():
+    flight = SingleFlight()
+
+    async def run():
+        gate = asyncio.Event()
+
+        async def work():
+            await gate.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        gate.set()
+        assert await second == "done"
+        assert first.cancelled()
+
+    asyncio.run(run())
+
+
+def test_last_waiter_cancelling_cancels_task():
+    flight = SingleFlight()
+    state = {}
+
+    async def work():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def run():
+        waiter = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert state.get("cancelled")
+    assert flight.waiter_counts() == {}
@@ -0,0 +1,53 @@
+import pytest
+
+from main import split_text
+
+
+def test_splits_on_sentence_boundaries():
+    text = "今日はいい天気ですね。散歩に行きましょう！そうしよう？"
+    assert split_text(text, 12) == ["今日はいい天気ですね。", "散歩に行きましょう！", "そうしよう？"]
+
+
+def test_merges_short_sentences_up_to_limit():
+    assert split_text("はい。いいえ。たぶん。", 60) == ["はい。いいえ。たぶん。"]
+
+
+def test_keeps_spaces_between_western_sentences():
+    assert split_text("Hello there. How are you?", 60) == ["Hello there. How are you?"]
+    assert split_text("Hello there. How are you? Fine.", 15) == ["Hello there.", "How are you?", "Fine."]
+
+
+def test_long_sentence_falls_back_to_clauses():
+    assert split_text("一、二、三、四、五、六、七、八", 6) == ["一、二、三、", "四、五、六、", "七、八"]
+
+
+def test_hard_split_without_punctuation():
+    chunks = split_text("あ" * 25, 10)
+    assert chunks == ["あ" * 10, "あ" * 10, "あ" * 5]
+
+
+@pytest.mark.parametrize("max_chars", [1, 5, 12, 60])
+def test_chunks_respect_limit_and_keep_content(max_chars):
+    text = "今日はいい天気ですね。散歩に行きましょう、それとも家で休みますか？どちらでも構いません。"
+    chunks = split_text(text, max_chars)
+    assert all(len(chunk) <= max_chars for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+def test_empty_text():
+    assert split_text("", 10) == []
+    assert split_text("   \n ", 10) == []
+
+
+def test_hard_split_does_not_break_western_words():
+    text = "The quick brown fox jumps over the lazy dog and then keeps running far far away from home."
+    chunks = split_text(text, 60)
+    assert chunks == [
+        "The quick brown fox jumps over the lazy dog and then keeps",
+        "running far far away from home.",
+    ]
+    assert " ".join(chunks) == text
+
+
+def test_hard_split_of_single_long_word():
+    assert split_text("supercalifragilisticexpialidocious", 10) == ["supercalif", "ragilistic", "expialidoc", "ious"]
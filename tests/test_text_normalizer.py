@@ -0,0 +1,76 @@
+import pytest
+
+from main import TextNormalizer
+
+
+@pytest.fixture
+def normalizer():
+    return TextNormalizer()
+
+
+def test_code_fence_is_removed_and_collected(normalizer):
+    text = "看这里：\n```python\nprint(1)\n```\n好的"
+    assert normalizer.normalize(text) == ("看这里：\n好的", ["print(1)"])
+
+
+def test_unterminated_fence_runs_to_end(normalizer):
+    assert normalizer.normalize("说明\n```\nrm -rf build") == ("说明", ["rm -rf build"])
+
+
+def test_inline_code_keeps_content(normalizer):
+    assert normalizer.normalize("调用 `hello()` 即可") == ("调用 hello() 即可", [])
+
+
+def test_markdown_link_keeps_text(normalizer):
+    assert normalizer.normalize("见[主页](https://a.com/x)。") == ("见主页。", ["https://a.com/x"])
+
+
+def test_url_excludes_trailing_punctuation(normalizer):
+    cleaned, refs = normalizer.normalize("访问 https://example.com/a?b=1。谢谢")
+    assert refs == ["https://example.com/a?b=1"]
+    assert "example" not in cleaned and cleaned.endswith("。谢谢")
+
+    assert normalizer.normalize("See https://example.com.")[1] == ["https://example.com"]
+
+
+def test_file_paths_are_removed(normalizer):
+    assert normalizer.normalize("配置在 /etc/genie/config.yaml 里")[1] == ["/etc/genie/config.yaml"]
+    assert normalizer.normalize("打开 C:\\Users\\me\\a.txt")[1] == ["C:\\Users\\me\\a.txt"]
+
+
+def test_fractions_and_words_with_slashes_are_kept(normalizer):
+    text = "ratio 3/4 and and/or"
+    assert normalizer.normalize(text) == (text, [])
+
+
+def test_emoji_and_qq_faces_are_removed(normalizer):
+    assert normalizer.normalize("好的😀👍 [CQ:face,id=14]收到") == ("好的收到", [])
+
+
+def test_whitespace_is_collapsed(normalizer):
+    assert normalizer.normalize("  a   b\n\n\n  c  ") == ("a b\nc", [])
+
+
+def test_duplicate_references_are_deduplicated(normalizer):
+    text = "先看 https://a.com 再看 https://a.com"
+    assert normalizer.normalize(text)[1] == ["https://a.com"]
+
+
+def test_disabled_filters_leave_content():
+    normalizer = TextNormalizer(filter_code=False, filter_emoji=False, filter_url=False)
+    assert normalizer.normalize("`x` 😀 https://a.com") == ("`x` 😀 https://a.com", [])
+
+
+def test_mixed_llm_reply(normalizer):
+    text = (
+        "好的😀 先看文档 https://docs.python.org/3/library/re.html 里的说明。\n\n"
+        "```bash\npip install -r requirements.txt\n```\n\n"
+        "配置在 /etc/genie/config.yaml，调用 `hello()` 即可✨"
+    )
+    cleaned, refs = normalizer.normalize(text)
+    assert cleaned == "好的先看文档 里的说明。\n配置在 ，调用 hello() 即可"
+    assert refs == [
+        "https://docs.python.org/3/library/re.html",
+        "pip install -r requirements.txt",
+        "/etc/genie/config.yaml",
+    ]
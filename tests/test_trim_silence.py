@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from main import SAMPLE_RATE, SAMPLE_WIDTH, SILENCE_KEEP_MS, trim_silence_pcm
+
+MS = SAMPLE_RATE // 1000
+
+
+def tone(ms: int, amplitude: int = 8000) -> bytes:
+    t = np.arange(ms * MS)
+    return (amplitude * np.sin(2 * np.pi * 440 * t / SAMPLE_RATE)).astype("<i2").tobytes()
+
+
+def silence(ms: int) -> bytes:
+    return b"\x00\x00" * (ms * MS)
+
+
+def test_trims_leading_and_keeps_trailing_margin():
+    voice = tone(500)
+    pcm = silence(300) + voice + silence(400)
+    trimmed = trim_silence_pcm(pcm)
+    assert trimmed.startswith(voice)
+    assert len(trimmed) == len(voice) + SILENCE_KEEP_MS * MS * SAMPLE_WIDTH
+
+
+def test_trailing_margin_is_capped_by_available_audio():
+    voice = tone(500)
+    pcm = silence(200) + voice + silence(30)
+    assert trim_silence_pcm(pcm) == voice + silence(30)
+
+
+def test_quiet_noise_counts_as_silence():
+    noise = tone(200, amplitude=50)  # 约 -59 dBFS，低于 -40 dBFS 门限
+    voice = tone(300)
+    assert trim_silence_pcm(noise + voice).startswith(voice)
+
+
+def test_all_silence_is_returned_unchanged():
+    pcm = silence(500)
+    assert trim_silence_pcm(pcm) == pcm
+
+
+def test_shorter_than_one_frame_is_returned_unchanged():
+    pcm = tone(5)
+    assert trim_silence_pcm(pcm) == pcm
+
+
+def test_loud_audio_is_not_trimmed():
+    pcm = tone(400)
+    assert trim_silence_pcm(pcm) == pcm